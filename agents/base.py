@@ -1,9 +1,135 @@
+import time
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
+
+from core.conversation_manager import PRIORITY_LOW, PRIORITY_NORMAL
+from core.event_loop import run_sync, iter_sync
+from core.logger import SessionLog, new_turn_id
+from core import metrics, timing
+from services.llm_service import acall_llm, astream_llm
+from services.prompt_builder import prompt_prefix
+from services.resilience import LLMUnavailableError
+from services.semantic_cache import faq_cache, is_cacheable
+from services.tokens import UsageTotals
+
+# Shown when the LLM is still unavailable after retries
+LLM_FAILURE_REPLY = (
+    "Sorry, I'm having trouble answering right now. "
+    "Please try again in a moment."
+)
+
+TURNS = metrics.counter(
+    "smilebot_turns_total", "Agent turns by outcome (ok|llm_unavailable)", ["agent", "outcome"]
+)
 
 class BaseAgent(ABC):
-    def __init__(self, conversation_manager):
-        self.conversation_manager = conversation_manager
+    name    = "Agent"
+    context = None                          # ConversationContext, set by subclasses
+
+    def __init__(self, memory_manager):
+        self.memory_manager = memory_manager
+        self.session_id     = memory_manager.session_id
+        self.turn_id        = None              # set per turn, for log correlation
+        self.log            = SessionLog(self.session_id)
+        self.usage          = UsageTotals()     # token usage for this session
+        self.reply_priority = PRIORITY_LOW      # memory priority of the last reply
+
+    async def astream_response(self, user_input: str, smart_mode: bool=False):
+        """
+        Runs one turn, yielding the reply in chunks as LLM tokens arrive.
+        Scripted replies come through as a single chunk. Records the turn's
+        wall time and time to first chunk.
+
+        Replies start as PRIORITY_LOW (scripted) and become PRIORITY_NORMAL
+        once the LLM writes any of them; handlers may pin important ones.
+        Callers pass ``reply_priority`` on to add_assistant_message.
+
+        Context updates made during the turn are journaled together once
+        it ends (see ConversationContext.deferred).
+        """
+        started = time.perf_counter()
+        self.turn_id        = new_turn_id()
+        self.reply_priority = PRIORITY_LOW
+        parts = []
+        outcome = "ok"
+        with self.context.deferred() if self.context is not None else nullcontext():
+            try:
+                async for chunk in self._respond(user_input.strip()):
+                    if not parts:
+                        timing.record(self.name, "first_chunk", time.perf_counter() - started)
+                    parts.append(chunk)
+                    yield chunk
+            except LLMUnavailableError:
+                outcome = "llm_unavailable"
+                chunk = ("\n\n" if parts else "") + LLM_FAILURE_REPLY
+                parts.append(chunk)
+                yield chunk
+        reply = "".join(parts)
+
+        elapsed = time.perf_counter() - started
+        timing.record(self.name, "turn", elapsed)
+        TURNS.labels(agent=self.name, outcome=outcome).inc()
+        self.log.interaction(self.turn_id, user_input, self.name, reply, elapsed)
+
+    async def agenerate_response(self, user_input: str, smart_mode: bool=False):
+        parts = [chunk async for chunk in self.astream_response(user_input, smart_mode)]
+        return "".join(parts), None, None
+
+    # ---- sync wrappers for main.py / app.py ----
+    def stream_response(self, user_input: str, smart_mode: bool=False):
+        return iter_sync(self.astream_response(user_input, smart_mode))
+
+    def generate_response(self, user_input: str, smart_mode: bool=False):
+        return run_sync(self.agenerate_response(user_input, smart_mode))
+
+    @property
+    def trace(self) -> dict:
+        """Correlation ids for services called during this turn."""
+        return {"session_id": self.session_id, "turn_id": self.turn_id}
+
+    # ---- LLM calls, accounted to this agent and session ----
+    async def _call_llm(self, system_prompt, history: list, user_text: str, **kwargs) -> str:
+        self._mark_generated(kwargs.get("purpose"))
+        return await acall_llm(system_prompt, history, user_text, agent=self.name,
+                               session_usage=self.usage, **self.trace, **kwargs)
+
+    def _stream_llm(self, system_prompt, history: list, user_text: str, **kwargs):
+        self._mark_generated(kwargs.get("purpose"))
+        return astream_llm(system_prompt, history, user_text, agent=self.name,
+                           session_usage=self.usage, **self.trace, **kwargs)
+
+    async def _answer_question(self, scope: str, question: str, user_type: str,
+                               system_prompt, user_text: str):
+        """
+        Streams a short answer to a free-form question. One that stands on
+        its own (see is_cacheable) is answered from the bot's static prompt
+        prefix alone, without session details or history, so the answer can
+        be shared with every session through faq_cache. Anything else gets
+        the full context and is never cached.
+        """
+        if faq_cache is None or not is_cacheable(question):
+            async for chunk in self._stream_llm(system_prompt, self.memory_manager.get_last_messages(),
+                                                user_text, purpose="short_answer"):
+                yield chunk
+            return
+
+        hit = faq_cache.lookup(scope, question)
+        if hit:
+            yield hit
+            return
+        answer = ""
+        async for chunk in self._stream_llm(prompt_prefix(user_type), [], user_text,
+                                            purpose="short_answer"):
+            answer += chunk
+            yield chunk
+        faq_cache.store(scope, question, answer)
+
+    def _mark_generated(self, purpose):
+        # A classify call only picks a scripted branch; the reply stays scripted
+        if purpose != "classify":
+            self.reply_priority = max(self.reply_priority, PRIORITY_NORMAL)
 
     @abstractmethod
-    def generate_response(self, user_input: str, smart_mode: bool):
-        pass
+    async def _respond(self, txt: str):
+        """Async generator: yields the reply in chunks."""
+        yield ""
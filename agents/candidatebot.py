@@ -1,10 +1,13 @@
-import json
-import os
+import asyncio
 
-from services.llm_service import call_llm
+from agents.base import BaseAgent
+from core.conversation_manager import PRIORITY_PINNED
+from core.timing import timed
+from services import webhooks
 from services.email_service import EmailService
+from services.message_store import summary_store
+from services.readiness_classifier import classify_readiness
 from ui.context_handler import ConversationContext
-from core.logger import log_interaction
 
 # Triggers that *might* indicate “done” — fast path
 END_DOC_TRIGGERS = {
@@ -20,7 +23,9 @@ QUESTION_WORDS = {
     "is", "are", "can", "could", "would", "should"
 }
 
-class CandidateBot:
+class CandidateBot(BaseAgent):
+    name = "CandidateBot"
+
     def __init__(
         self,
         memory_manager,
@@ -28,53 +33,58 @@ class CandidateBot:
         context: ConversationContext,
         email_service: EmailService = None
     ):
-        self.memory_manager = memory_manager
+        super().__init__(memory_manager)
         self.system_prompt   = system_prompt
         self.context         = context
         self.email_service   = email_service or EmailService()
 
-    def generate_response(self, user_input: str, smart_mode: bool=False):
-        # Log the incoming user message
-        log_interaction(user_input, "CandidateBot", "", 0.0)
-
-        txt = user_input.strip()
+    async def _respond(self, txt: str):
         ctx = self.context.data
 
         # ─── Stage 1: Onboarding ───────────────────────
         if not ctx["script_complete"]:
-            reply = self._handle_onboarding(txt)
+            with timed(self.name, "scripted"):
+                reply = self._handle_onboarding(txt)
+            yield reply
 
         # ─── Stage 2: Documents Q&A & Email send ───────
         elif not ctx["final_upload_email_sent"]:
-            reply = self._handle_document_stage(txt)
+            async for chunk in self._handle_document_stage(txt):
+                yield chunk
 
         # ─── Stage 3: Post-email Q&A & Close ──────────
         else:
             if txt.lower() in END_DOC_TRIGGERS:
                 # Final closing via LLM
-                closing = call_llm(
+                closing = ""
+                async for chunk in self._stream_llm(
                     self.system_prompt,
                     self.memory_manager.get_last_messages(),
-                    "Write a warm closing message summarising next steps."
-                )
-                # Persist final summary
-                os.makedirs("summaries", exist_ok=True)
-                fname = ctx["email"].lower().replace(" ", "_")
-                with open(f"summaries/{fname}_summary.json", "w") as f:
-                    json.dump({"context": ctx, "closing_message": closing}, f, indent=2)
-
-                reply = closing + "\n\nThank you for choosing Smile Education. Goodbye!"
+                    "Write a warm closing message summarising next steps.",
+                    purpose="summary",
+                    use_cache=False     # one-off per candidate, never repeats
+                ):
+                    closing += chunk
+                    yield chunk
+                # Persist final summary (fsyncs, so off the event loop)
+                with timed(self.name, "summary"):
+                    msg_id, path = await asyncio.to_thread(
+                        summary_store.save, ctx["email"], "summary",
+                        {"context": dict(ctx), "closing_message": closing, "session_id": self.session_id},
+                        self.session_id
+                    )
+                    self.log.event("summary", self.turn_id, path=path, message_id=msg_id)
+
+                yield "\n\nThank you for choosing Smile Education. Goodbye!"
             else:
                 # Any other follow-up: open LLM Q&A
-                reply = call_llm(
+                async for chunk in self._stream_llm(
                     self.system_prompt,
                     self.memory_manager.get_last_messages(),
-                    txt
-                )
-
-        # Log and return
-        log_interaction(user_input, "CandidateBot", reply, 0.0)
-        return reply, None, None
+                    txt,
+                    purpose="short_answer"
+                ):
+                    yield chunk
 
 
     def _handle_onboarding(self, txt: str) -> str:
@@ -108,7 +118,8 @@ class CandidateBot:
         self.context.update("postcode", txt.upper())
         self.context.update("script_complete", True)
 
-        # Integrated first docs prompt
+        # Integrated first docs prompt; later document questions refer back to it
+        self.reply_priority = PRIORITY_PINNED
         return (
             "✅ Thanks! Your personal details are saved.\n\n"
             "📑 To complete your registration, you'll need:\n"
@@ -122,65 +133,83 @@ class CandidateBot:
         )
 
 
-    def _handle_document_stage(self, txt: str) -> str:
+    async def _handle_document_stage(self, txt: str):
         """
         Hybrid logic for the documents stage:
         1) Rule-based done?
-        2) Question detection -> LLM answer
-        3) LLM classify done?
+        2) Question detection -> similar cached answer, else LLM answer
+        3) Local classifier done? (LLM classify when unsure)
         4) Otherwise, LLM generic guidance
+        Async generator: yields the reply in chunks.
         """
         ctx = self.context.data
         lower = txt.lower()
 
         # 1) Fast rule-based done
         if lower in END_DOC_TRIGGERS:
-            return self._send_email_and_summary()
+            yield await self._send_email_and_summary()
+            return
 
         # 2) If it looks like a question
         first = lower.split()[0] if lower.split() else ""
         if txt.endswith("?") or first in QUESTION_WORDS:
-            return call_llm(
-                self.system_prompt,
-                self.memory_manager.get_last_messages(),
+            async for chunk in self._answer_question(
+                "candidate_docs", txt, "candidate", self.system_prompt,
                 f"A candidate asked about documents:\n\"{txt}\"\n\n"
                 "Please explain clearly what happens after they upload the documents."
+            ):
+                yield chunk
+            return
+
+        # 3) Local classifier; LLM classify (stage digest) only when unsure
+        done = classify_readiness(txt)
+        if done is None:
+            classify_prompt = (
+                "Based on the document-collection conversation so far:\n"
+                + self.memory_manager.get_stage_digest()
+                + "\n\nHas the user indicated they are done and ready to upload? Reply 'Yes' or 'No' only."
             )
+            flag = (await self._call_llm(
+                self.system_prompt,
+                self.memory_manager.get_last_messages(),
+                classify_prompt,
+                purpose="classify"
+            )).strip().lower()
+            done = flag.startswith("yes")
 
-        # 3) Fallback: LLM classify readiness using full stage context
-        classify_prompt = (
-            "Based on the document-collection conversation so far:\n"
-            + "\n".join(self.memory_manager.get_stage_messages())
-            + "\n\nHas the user indicated they are done and ready to upload? Reply 'Yes' or 'No' only."
-        )
-        flag = call_llm(
-            self.system_prompt,
-            self.memory_manager.get_last_messages(),
-            classify_prompt
-        ).strip().lower()
-
-        if flag.startswith("yes"):
-            return self._send_email_and_summary()
+        if done:
+            yield await self._send_email_and_summary()
+            return
 
         # 4) Generic guidance via LLM
-        return call_llm(
+        async for chunk in self._stream_llm(
             self.system_prompt,
             self.memory_manager.get_last_messages(),
             f"A candidate said:\n\"{txt}\"\n\n"
-            "Provide guidance about these required documents."
-        )
+            "Provide guidance about these required documents.",
+            purpose="short_answer"
+        ):
+            yield chunk
 
 
-    def _send_email_and_summary(self) -> str:
+    async def _send_email_and_summary(self) -> str:
         """
-        Perform the email send and reset stage history.
+        Perform the email send and reset stage history. The outbox and
+        webhook writes run in a worker thread, off the event loop.
         """
         ctx     = self.context.data
         summary = self.context.dump_context()
-        link    = self.email_service.send_upload_form(ctx["email"], summary)
+        with timed(self.name, "email"):
+            link = await asyncio.to_thread(
+                self.email_service.send_upload_form, ctx["email"], summary, **self.trace
+            )
 
         self.context.update("documents_checked", True)
         self.context.update("final_upload_email_sent", True)
+        await asyncio.to_thread(webhooks.publish, "candidate.registered", self.session_id, {
+            "candidate":   {k: v for k, v in ctx.items() if v not in (None, False)},
+            "upload_link": link,
+        }, self.turn_id)
         self.memory_manager.reset_stage_messages()
 
         return (
@@ -1,17 +1,17 @@
-from services.llm_service import call_llm
+from agents.base import BaseAgent
 from ui.context_handler     import ConversationContext
-from core.logger import log_interaction
 
-class GeneralBot:
-    def __init__(self, memory_manager, system_prompt: str, context: ConversationContext):
-        self.memory_manager = memory_manager
+class GeneralBot(BaseAgent):
+    name = "GeneralBot"
+
+    def __init__(self, memory_manager, system_prompt: str, context: ConversationContext,
+                 greeted: bool = False):
+        super().__init__(memory_manager)
         self.system_prompt  = system_prompt
         self.context        = context
-        self._greeted       = False
+        self._greeted       = greeted     # True when resuming a stored session
 
-    def generate_response(self, user_input: str, smart_mode: bool=False):
-        log_interaction(user_input, "GeneralBot", "", 0.0)
-        txt = user_input.strip()
+    async def _respond(self, txt: str):
         ctx = self.context.data
 
         # 1) First turn: greeting & triage
@@ -26,7 +26,7 @@ class GeneralBot:
 
         # 2) Triage to CandidateBot
         elif txt.lower() in ("1", "find job", "find a job", "job", "looking for work"):
-            ctx["user_type"] = "candidate"
+            self.context.update("user_type", "candidate")
             reply = (
                 "Great — I'll connect you to our candidate flow. "
                 "Please restart and type 'start' to begin."
@@ -34,19 +34,16 @@ class GeneralBot:
 
         # 3) Triage to SchoolBot
         elif txt.lower() in ("2", "recruit staff", "recruit", "staff", "looking to recruit"):
-            ctx["user_type"] = "school"
+            self.context.update("user_type", "school")
             reply = (
                 "Excellent — I'll connect you to our school recruitment flow. "
                 "Please restart and type 'start' to begin."
             )
 
-        # 4) Free-form Q&A via LLM
+        # 4) Free-form Q&A: reuse a near-duplicate answer, else LLM
         else:
-            reply = call_llm(
-                self.system_prompt,
-                self.memory_manager.get_last_messages(),
-                txt
-            )
+            async for chunk in self._answer_question("general", txt, "other", self.system_prompt, txt):
+                yield chunk
+            return
 
-        log_interaction(user_input, "GeneralBot", reply, 0.0)
-        return reply, None, None
+        yield reply
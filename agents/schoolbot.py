@@ -1,11 +1,14 @@
+import asyncio
 import json
 import os
 
-from services.llm_service import call_llm
+from agents.base import BaseAgent
+from core.conversation_manager import PRIORITY_PINNED
+from core.timing import timed
+from services import webhooks
 from services.email_service import EmailService
 from ui.context_handler     import ConversationContext
 from services.prompt_builder import build_prompt
-from core.logger import log_interaction
 
 # Rule‐based cues for “send me the CVs”
 END_SUGGEST_TRIGGERS = {"yes", "please send", "send", "email", "okay", "sure"}
@@ -15,57 +18,60 @@ BOOKING_TRIGGERS = {"interview", "schedule", "book", "portal"}
 SCHOOL_TYPES = ["Primary", "Secondary", "SEND", "Nursery", "Other"]
 FTE_OPTIONS  = ["Full-time", "Part-time"]
 
-class SchoolBot:
+class SchoolBot(BaseAgent):
+    name = "SchoolBot"
+
     def __init__(self,
                  memory_manager,
                  context: ConversationContext,
                  email_service: EmailService=None):
-        self.memory_manager = memory_manager
+        super().__init__(memory_manager)
         self.context        = context
         self.email_service  = email_service or EmailService()
 
-    def generate_response(self, user_input: str, smart_mode: bool=False):
-        log_interaction(user_input, "SchoolBot", "", 0.0)
-        txt = user_input.strip()
-        self.memory_manager.add_user_message(txt)
+    async def _respond(self, txt: str):
         ctx = self.context.data
 
         # 1) Onboarding questions (name → postcode → email → phone)
         if not ctx.get("script_complete", False):
-            reply = self._handle_onboarding(txt)
+            with timed(self.name, "scripted"):
+                reply = self._handle_onboarding(txt)
+            yield reply
 
         # 2) Requirements (start date → contract length → suggestions)
         elif not ctx.get("requirements_captured", False):
-            reply = self._handle_requirements(txt)
+            async for chunk in self._handle_requirements(txt):
+                yield chunk
 
         # 3) Send out 3 candidate profiles
         elif not ctx.get("suggestions_sent", False):
-            reply = self._handle_suggestions()
+            async for chunk in self._handle_suggestions():
+                yield chunk
 
         # 4) Before final_closed: handle CV-email or booking triggers
         elif not ctx.get("final_closed", False):
             lower = txt.lower()
             if any(trigger in lower for trigger in END_SUGGEST_TRIGGERS):
-                reply = self._send_candidate_email()
+                yield await self._send_candidate_email()
             elif any(trigger in lower for trigger in BOOKING_TRIGGERS):
-                reply = self._send_booking_portal()
+                yield await self._send_booking_portal()
             else:
-                reply = call_llm(
-                    build_prompt("school", ctx),
+                async for chunk in self._stream_llm(
+                    build_prompt("school", self.context),
                     self.memory_manager.get_last_messages(),
-                    txt
-                )
+                    txt,
+                    purpose="short_answer"
+                ):
+                    yield chunk
         else:
             # 5) Ongoing Q&A
-            reply = call_llm(
-                build_prompt("school", ctx),
+            async for chunk in self._stream_llm(
+                build_prompt("school", self.context),
                 self.memory_manager.get_last_messages(),
-                txt
-            )
-
-        self.memory_manager.add_assistant_message(reply)
-        log_interaction(user_input, "SchoolBot", reply, 0.0)
-        return reply, None, None
+                txt,
+                purpose="short_answer"
+            ):
+                yield chunk
 
     def _handle_onboarding(self, txt: str) -> str:
         ctx = self.context.data
@@ -91,47 +97,56 @@ class SchoolBot:
         self.context.update("script_complete", True)
         return "✅ Thanks! I have your school details.\n\nWhen do you need this role to start?"
 
-    def _handle_requirements(self, txt: str) -> str:
+    async def _handle_requirements(self, txt: str):
         ctx = self.context.data
 
         # 1) Start date
         if not ctx.get("start_date"):
             self.context.update("start_date", txt)
-            return "🤖 And how long do you need the contract for? (e.g. 6 months, permanent)"
+            yield "🤖 And how long do you need the contract for? (e.g. 6 months, permanent)"
+            return
 
         # 2) Contract length → suggestions
         self.context.update("contract_length", txt)
         self.context.update("requirements_captured", True)
-        return self._handle_suggestions()
+        async for chunk in self._handle_suggestions():
+            yield chunk
 
-    def _handle_suggestions(self) -> str:
+    async def _handle_suggestions(self):
         prompt_text = (
             "Based on this school’s needs:\n"
             f"{self.context.dump_context()}\n\n"
             "Generate 3 brief candidate profiles (name + 2–3 bullet points each)."
         )
-        profiles = call_llm(
-            build_prompt("school", self.context.data),
+        yield "✅ Here are 3 candidates I’ve found:\n\n"
+        self.reply_priority = PRIORITY_PINNED       # follow-up questions are about these
+        async for chunk in self._stream_llm(
+            build_prompt("school", self.context),
             self.memory_manager.get_last_messages(),
-            prompt_text
-        ).strip()
+            prompt_text,
+            purpose="long_generation",
+            use_cache=False     # embeds this school's details, never repeats
+        ):
+            yield chunk
 
         self.context.update("suggestions_sent", True)
         self.memory_manager.reset_stage_messages()
 
-        return (
-            "✅ Here are 3 candidates I’ve found:\n\n"
-            f"{profiles}\n\n"
-            "Would you like me to email you their full CVs? (type 'yes' or ask any questions)"
-        )
+        yield "\n\nWould you like me to email you their full CVs? (type 'yes' or ask any questions)"
 
-    def _send_candidate_email(self) -> str:
+    async def _send_candidate_email(self) -> str:
         ctx = self.context.data
         summary = self.context.dump_context()
-        path    = self.email_service.send_candidate_list(
-                      ctx["school_email"], summary
-                  )
+        with timed(self.name, "email"):
+            # Outbox and webhook writes run off the event loop
+            path = await asyncio.to_thread(
+                self.email_service.send_candidate_list, ctx["school_email"], summary, **self.trace
+            )
         self.context.update("final_closed", True)
+        await asyncio.to_thread(webhooks.publish, "school.shortlist_sent", self.session_id, {
+            "school":    {k: v for k, v in ctx.items() if v not in (None, False)},
+            "shortlist": path,
+        }, self.turn_id)
 
         return (
             "📧 Email sent!\n\n"
@@ -140,15 +155,17 @@ class SchoolBot:
             "via our portal. If you need anything else, just let me know!"
         )
 
-    def _send_booking_portal(self) -> str:
+    async def _send_booking_portal(self) -> str:
         ctx = self.context.data
         # Send a booking‐portal email (reuse candidate list sender)
         summary = (
             "Interview booking requested for: " 
             f"{ctx.get('school_name','')} on {ctx.get('start_date','')}")
-        path = self.email_service.send_candidate_list(
-            ctx["school_email"], summary
-        )
+        with timed(self.name, "email"):
+            path = await asyncio.to_thread(
+                self.email_service.send_candidate_list, ctx["school_email"], summary,
+                **self.trace, kind="booking_portal"
+            )
         self.context.update("final_closed", True)
         return (
             "📧 Interview‐portal email sent!"
@@ -17,22 +17,73 @@ from agents.candidatebot import CandidateBot
 from agents.schoolbot import SchoolBot, SCHOOL_TYPES, FTE_OPTIONS
 from agents.generalbot import GeneralBot
 from core.conversation_manager import ConversationManager
+from core.session_store import session_store
+from core import metrics, timing
 
 # Simple stderr logger
 
 def slog(msg):
     print(f"[LOG] {msg}", file=sys.stderr)
 
+# Prometheus scrape endpoint (once per process, not per rerun)
+metrics.start_server()
+
 # Streamlit page config
 st.set_page_config(page_title="Smile Education Bot", layout="wide", initial_sidebar_state="collapsed")
 
+# ─── Durable sessions ─────────────────────────────────────────────────────
+# The session id lives in the URL (?sid=...), so reloading after a restart
+# rebuilds the conversation from core/session_store without any LLM calls.
+
+def new_session():
+    journal, sid = None, None
+    if session_store:
+        sid = session_store.new_session()
+        st.query_params["sid"] = sid
+        journal = session_store.journal(sid)
+    st.session_state.ctx = ConversationContext(journal)
+    st.session_state.mgr = ConversationManager(journal=journal, session_id=sid)
+
+def resume_session(sid):
+    ctx, mgr = ConversationContext(), ConversationManager(session_id=sid)
+    st.session_state.history = session_store.restore(sid, mgr, ctx)
+    st.session_state.ctx, st.session_state.mgr = ctx, mgr
+
+    # Pick the stage (and agent) the conversation had reached
+    agent, stage = None, "flow_select"
+    user_type = ctx.get("user_type")
+    if user_type == "other":
+        agent = GeneralBot(mgr, build_prompt("other", ctx), ctx, greeted=True)
+    elif user_type == "candidate":
+        if ctx.get("job_type"):
+            agent = CandidateBot(mgr, build_prompt("candidate", ctx), ctx, EmailService())
+        else:
+            stage = "cand_job_type" if ctx.get("school_interest") else "cand_school_interest"
+    elif user_type == "school":
+        if ctx.get("fte_status"):
+            agent = SchoolBot(mgr, ctx, EmailService())
+        elif ctx.get("role_needed"):
+            stage = "school_fte_select"
+        elif ctx.get("school_type"):
+            stage = "school_role_select"
+        else:
+            stage = "school_type_select"
+    st.session_state.agent = agent
+    st.session_state.stage = "chatting" if agent else stage
+    slog(f"resumed session {sid} at stage {st.session_state.stage}")
+
+if "ctx" not in st.session_state:
+    sid = st.query_params.get("sid")
+    if sid and session_store and session_store.exists(sid):
+        resume_session(sid)
+    else:
+        new_session()
+
 # ─── Session State Init ────────────────────────────────────────────────────
 # Ensure all required session state keys are initialized
 initial_state = {
     "stage": "flow_select",
     "history": [],
-    "ctx": ConversationContext(),
-    "mgr": ConversationManager(),
     "agent": None,
     "awaiting_response": False,
     "chat_input": "",
@@ -61,8 +112,7 @@ def reset_chat():
         })
     # Reset session state
     st.session_state.history = []
-    st.session_state.ctx = ConversationContext()
-    st.session_state.mgr = ConversationManager()
+    new_session()
     st.session_state.agent = None
     st.session_state.stage = "flow_select"
     st.session_state.awaiting_response = False
@@ -71,6 +121,17 @@ def reset_chat():
 # Sidebar UI
 with st.sidebar:
     st.button("🔄 Reset Chat", on_click=reset_chat)
+    if st.session_state.agent is not None:
+        u = st.session_state.agent.usage
+        st.caption(f"LLM usage this session: {u.calls} calls, "
+                   f"{u.prompt_tokens} prompt ({u.cached_tokens} cached) + "
+                   f"{u.completion_tokens} completion tokens")
+    with st.expander("🛠 Debug: latency (p50/p95/p99, seconds)", expanded=False):
+        rows = timing.snapshot()
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.caption("No timings recorded yet.")
     st.markdown("### Past Conversations")
     for i, conv in enumerate(st.session_state.past_conversations):
         with st.expander(f"Conversation {i+1}", expanded=False):
@@ -111,13 +172,13 @@ if stage == "flow_select":
         # Directly instantiate and seed GeneralBot here
         prompt = build_prompt(
             st.session_state.ctx.get("user_type"),
-            st.session_state.ctx.data
+            st.session_state.ctx
         )
         bot = GeneralBot(st.session_state.mgr, prompt, st.session_state.ctx)
         st.session_state.agent = bot
         reply, _, _ = bot.generate_response("start")
         st.session_state.history.append(("assistant", reply))
-        st.session_state.mgr.add_assistant_message(reply)
+        st.session_state.mgr.add_assistant_message(reply, bot.reply_priority)
         st.session_state.stage = "chatting"
         st.rerun()("Other", key="flow_other")
         choice = "Other"
@@ -149,7 +210,7 @@ elif stage == "cand_job_type":
             st.session_state.mgr.add_user_message(opt)
             st.session_state.ctx.update("job_type", opt)
 
-            prompt = build_prompt("candidate", st.session_state.ctx.data)
+            prompt = build_prompt("candidate", st.session_state.ctx)
             bot = CandidateBot(
                 st.session_state.mgr,
                 prompt,
@@ -159,7 +220,7 @@ elif stage == "cand_job_type":
             st.session_state.agent = bot
             reply, _, _ = bot.generate_response("start")
             st.session_state.history.append(("assistant", reply))
-            st.session_state.mgr.add_assistant_message(reply)
+            st.session_state.mgr.add_assistant_message(reply, bot.reply_priority)
             st.session_state.stage = "chatting"
             st.rerun()
 
@@ -203,7 +264,7 @@ elif stage == "school_fte_select":
             st.session_state.agent = bot
             reply, _, _ = bot.generate_response("start")
             st.session_state.history.append(("assistant", reply))
-            st.session_state.mgr.add_assistant_message(reply)
+            st.session_state.mgr.add_assistant_message(reply, bot.reply_priority)
             st.session_state.stage = "chatting"
             st.rerun()
 
@@ -213,9 +274,12 @@ elif stage == "chatting":
     if last == "user" and not st.session_state.awaiting_response:
         st.session_state.awaiting_response = True
         user_msg = st.session_state.history[-1][1]
-        reply, _, _ = st.session_state.agent.generate_response(user_msg)
+        # Render tokens as they arrive instead of waiting for the full reply
+        reply = st.chat_message("assistant").write_stream(
+            st.session_state.agent.stream_response(user_msg)
+        )
         st.session_state.history.append(("assistant", reply))
-        st.session_state.mgr.add_assistant_message(reply)
+        st.session_state.mgr.add_assistant_message(reply, st.session_state.agent.reply_priority)
         st.session_state.awaiting_response = False
         st.rerun()
 
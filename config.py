@@ -1,4 +1,116 @@
+import json
 import os
 
-# How many messages to buffer before summarizing
+# How many log entries core/logger keeps in memory
 MESSAGE_BUFFER_SIZE = int(os.getenv("MESSAGE_BUFFER_SIZE", "10"))
+
+# Append-only JSON-lines log (core/logger.py), rotated by size or age
+LOG_PATH        = os.getenv("LOG_PATH", "logs/conversation.jsonl")
+LOG_MAX_BYTES   = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_ROTATE_SECS = float(os.getenv("LOG_ROTATE_SECS", str(24 * 3600)))
+LOG_BACKUPS     = int(os.getenv("LOG_BACKUPS", "5"))
+LOG_BATCH_SIZE  = int(os.getenv("LOG_BATCH_SIZE", "512"))
+
+# Searchable index over the logs and session transcripts (services/log_index.py)
+LOG_INDEX_PATH = os.getenv("LOG_INDEX_PATH", "logs/index.sqlite3")
+
+# Prometheus-style /metrics endpoint (core/metrics.py)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_HOST    = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT    = int(os.getenv("METRICS_PORT", "9108"))
+
+# Sharded, atomic message files with a recipient manifest (services/message_store.py)
+EMAIL_STORE_ROOT   = os.getenv("EMAIL_STORE_ROOT", "emails")
+SUMMARY_STORE_ROOT = os.getenv("SUMMARY_STORE_ROOT", "summaries")
+
+# Durable email outbox (services/outbox.py): sends are queued, then
+# delivered in batches by a background worker
+EMAIL_OUTBOX_PATH = os.getenv("EMAIL_OUTBOX_PATH", "outbox/email.sqlite3")
+EMAIL_BATCH_SIZE  = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+
+# Where the outbox delivers (services/email_backends.py): "file" only writes
+# the message store; "smtp" also sends over a pool of persistent connections.
+# The defaults point at the local sink: python -m services.smtp_sink
+EMAIL_BACKEND  = os.getenv("EMAIL_BACKEND", "file")
+SMTP_HOST      = os.getenv("SMTP_HOST", "127.0.0.1")
+SMTP_PORT      = int(os.getenv("SMTP_PORT", "8025"))
+SMTP_USER      = os.getenv("SMTP_USER") or None
+SMTP_PASSWORD  = os.getenv("SMTP_PASSWORD") or None
+SMTP_STARTTLS  = os.getenv("SMTP_STARTTLS", "0") == "1"
+SMTP_FROM      = os.getenv("SMTP_FROM", "Smile Education <no-reply@smile-education.example>")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "4"))
+SMTP_TIMEOUT   = float(os.getenv("SMTP_TIMEOUT", "10"))
+
+# Applicant-tracking system webhook (services/webhooks.py); unset disables it.
+# Local stand-in: python -m services.webhook_sink (http://127.0.0.1:8090/events)
+WEBHOOK_URL          = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_TOKEN        = os.getenv("WEBHOOK_TOKEN") or None
+WEBHOOK_OUTBOX_PATH  = os.getenv("WEBHOOK_OUTBOX_PATH", "outbox/webhooks.sqlite3")
+WEBHOOK_BATCH_SIZE   = int(os.getenv("WEBHOOK_BATCH_SIZE", "100"))
+WEBHOOK_CONCURRENCY  = int(os.getenv("WEBHOOK_CONCURRENCY", "4"))
+WEBHOOK_TIMEOUT      = float(os.getenv("WEBHOOK_TIMEOUT", "10"))
+WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+
+# Token budget for the raw message window before older messages are summarized
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+
+# Stage buffer for the documents-stage classify prompt: recent inputs kept
+# verbatim, older ones condensed to a few words each (and then dropped)
+STAGE_BUFFER_RAW       = int(os.getenv("STAGE_BUFFER_RAW", "4"))
+STAGE_BUFFER_CONDENSED = int(os.getenv("STAGE_BUFFER_CONDENSED", "8"))
+
+# Durable conversation journal for resuming sessions (core/session_store.py)
+SESSION_STORE_ENABLED = os.getenv("SESSION_STORE_ENABLED", "1") == "1"
+SESSION_STORE_PATH    = os.getenv("SESSION_STORE_PATH", "sessions/sessions.sqlite3")
+
+# Exact-match LLM response cache (services/llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH    = os.getenv("LLM_CACHE_PATH", "cache/llm_responses.sqlite3")
+LLM_CACHE_SIZE    = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+LLM_CACHE_TTL     = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Similarity cache for free-form FAQ answers (services/semantic_cache.py)
+SEMANTIC_CACHE_ENABLED   = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.85"))
+SEMANTIC_CACHE_SIZE      = int(os.getenv("SEMANTIC_CACHE_SIZE", "2000"))
+
+# Local readiness classifier for the candidate documents stage
+READINESS_MODEL_PATH     = os.getenv("READINESS_MODEL_PATH", "models/readiness_nb.json")
+READINESS_MIN_CONFIDENCE = float(os.getenv("READINESS_MIN_CONFIDENCE", "0.85"))
+
+# LLM backend (services/llm_backends.py): openai | stub | recorded | record
+LLM_BACKEND        = os.getenv("LLM_BACKEND", "openai")
+LLM_MODEL          = os.getenv("LLM_MODEL", "gpt-4")
+LLM_STUB_URL       = os.getenv("LLM_STUB_URL", "http://127.0.0.1:8765/v1")
+LLM_RECORDING_PATH = os.getenv("LLM_RECORDING_PATH", "recordings/llm_calls.jsonl")
+
+# Max prompt tokens per LLM call; oldest history is dropped to fit
+LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "6000"))
+
+# Purpose-based routing: each call site declares a purpose, which picks the
+# model and generation params (None = provider default), the per-attempt
+# deadline in seconds (time to first token when streaming) and whether to
+# hedge. Override per purpose with JSON, e.g.
+# LLM_ROUTES='{"classify": {"model": "gpt-4o", "timeout": 3}}'
+LLM_ROUTES = {
+    "classify":        {"model": "gpt-4o-mini", "max_tokens": 2,    "temperature": 0.0,
+                        "timeout": 5,  "hedge": True},
+    "short_answer":    {"model": LLM_MODEL,     "max_tokens": 400,  "temperature": 0.5,
+                        "timeout": 30, "hedge": False},
+    "long_generation": {"model": LLM_MODEL,     "max_tokens": None, "temperature": None,
+                        "timeout": 90, "hedge": False},
+    "summary":         {"model": "gpt-4o-mini", "max_tokens": 400,  "temperature": 0.3,
+                        "timeout": 30, "hedge": False},
+}
+for _purpose, _overrides in json.loads(os.getenv("LLM_ROUTES", "{}")).items():
+    LLM_ROUTES.setdefault(_purpose, dict(LLM_ROUTES["long_generation"])).update(_overrides)
+
+# Retries on 429/5xx/timeouts: full-jitter exponential backoff
+LLM_MAX_RETRIES    = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE   = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_CAP    = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+# Hedge delay until enough calls have been seen to estimate p95
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "1.5"))
+
+# Fold messages evicted from the buffer into a rolling LLM summary
+MEMORY_SUMMARY_ENABLED = os.getenv("MEMORY_SUMMARY_ENABLED", "1") == "1"
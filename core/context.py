@@ -1,54 +1,235 @@
-from collections.abc import MutableMapping
+# core/context.py
 
-class ConversationContext(MutableMapping):
-    def __init__(self):
-        self.data = {
-            "user_type": None,
-            "school_interest": None,
-            "job_type": None,
-            "school_type": None,
-            "role_needed": None,
-            "name": None,
-            "postcode": None,
-            "email": None,
-            "phone": None,
-            # phase flags:
-            "script_complete": False,           # finished onboarding
-            "doc_phase_started": False,         # shown the doc checklist
-            "documents_checked": False,         # user done with docs Q&A
-            "has_id": None,                     # True/False
-            "has_address": None,                # True/False
-            "has_qualifications": None,         # True/False
-            "needs_dbs_help": None,             # True/False
-            "final_upload_email_sent": False    # email+summary sent
-        }
+import json
+import struct
+from collections.abc import Mapping, MutableMapping
+from contextlib import contextmanager
+
+# (name, default, stage flag?). The order is part of the binary format
+# below: add new fields at the end, never reorder or remove.
+SCHEMA = (
+    # Universal
+    ("user_type",               None,  False),
+
+    # Candidate flow
+    ("school_interest",         None,  False),
+    ("job_type",                None,  False),
+    ("name",                    None,  False),
+    ("email",                   None,  False),
+    ("phone",                   None,  False),
+    ("postcode",                None,  False),
+    ("script_complete",         False, True),
+    ("doc_prompt_sent",         False, True),
+    ("documents_checked",       False, True),
+    ("final_upload_email_sent", False, True),
+
+    # School flow
+    ("school_type",             None,  False),
+    ("role_needed",             None,  False),
+    ("school_name",             None,  False),
+    ("school_postcode",         None,  False),
+    ("school_email",            None,  False),
+    ("school_phone",            None,  False),
+    ("start_date",              None,  False),
+    ("contract_length",         None,  False),
+    ("fte_status",              None,  False),
+    ("special_requirements",    None,  False),
+    ("requirements_captured",   False, True),
+    ("suggestions_sent",        False, True),
+    ("final_closed",            False, True),
+)
+FIELDS   = tuple(name for name, _, _ in SCHEMA)
+DEFAULTS = tuple(default for _, default, _ in SCHEMA)
+_INDEX   = {name: i for i, name in enumerate(FIELDS)}
+_ALL     = (1 << len(FIELDS)) - 1
+assert len(FIELDS) <= 64, "the binary format's field mask is 64 bits"
+
+# Binary format: format byte, 64-bit field mask, then one tagged value per
+# field in the mask, in schema order.
+_FORMAT = 1
+_HEADER = struct.Struct("<BQ")
+_INT    = struct.Struct("<q")
+_NONE, _FALSE, _TRUE, _STR, _INTEGER, _JSON = range(6)
+
+def _varint(n: int) -> bytes:
+    if n < 0x80:
+        return bytes([n])
+    out = bytearray()
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+def _get_varint(blob: bytes, pos: int):
+    n = shift = 0
+    while True:
+        b = blob[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+_CONSTANTS = {None: bytes([_NONE]), False: bytes([_FALSE]), True: bytes([_TRUE])}
+
+def _encode(value) -> bytes:
+    if value is None or isinstance(value, bool):
+        return _CONSTANTS[value]
+    if isinstance(value, str):
+        raw = value.encode("utf-8")
+        return bytes([_STR]) + _varint(len(raw)) + raw
+    if isinstance(value, int) and -2**63 <= value < 2**63:
+        return bytes([_INTEGER]) + _INT.pack(value)
+    raw = json.dumps(value, ensure_ascii=False).encode("utf-8")
+    return bytes([_JSON]) + _varint(len(raw)) + raw
+
+def _decode(blob: bytes, pos: int):
+    tag = blob[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag in (_FALSE, _TRUE):
+        return tag == _TRUE, pos
+    if tag == _INTEGER:
+        return _INT.unpack_from(blob, pos)[0], pos + _INT.size
+    n, pos = _get_varint(blob, pos)
+    raw = str(blob[pos:pos + n], "utf-8")
+    return (raw if tag == _STR else json.loads(raw)), pos + n
+
+class ContextView(Mapping):
+    """Live, read-only mapping over a context's fields (``context.data``)."""
+    __slots__ = ("_ctx",)
+
+    def __init__(self, ctx):
+        self._ctx = ctx
 
-    # ---- MutableMapping / dict-like interface ----
     def __getitem__(self, key):
-        return self.data[key]
+        if key not in _INDEX:
+            raise KeyError(key)
+        return getattr(self._ctx, key)
+
+    def __iter__(self):  return iter(FIELDS)
+    def __len__(self):   return len(FIELDS)
+    def __repr__(self):  return f"ContextView({dict(self)!r})"
 
-    def __setitem__(self, key, value):
-        if key not in self.data:
+class ConversationContext(MutableMapping):
+    """
+    Shared context for both flows, plus stage flags, one slot per SCHEMA
+    field. Every update bumps ``version`` (so derived values such as
+    prompts can be cached) and marks the field dirty.
+
+    Dirty fields are appended to ``journal`` (see core/session_store.py)
+    as one compact binary delta on commit(): straight after the update,
+    or once at the end of a ``deferred()`` block, which is how agents
+    batch a whole turn into a single write.
+    """
+    __slots__ = FIELDS + ("journal", "version", "prompt_cache", "_dirty", "_deferred")
+
+    # Stage bookkeeping, not facts about the user; kept out of prompts
+    FLAGS = frozenset(name for name, _, flag in SCHEMA if flag)
+
+    def __init__(self, journal=None):
+        for name, default in zip(FIELDS, DEFAULTS):
+            setattr(self, name, default)
+        self.journal      = journal
+        self.version      = 0
+        self.prompt_cache = {}              # user_type -> (version, prompt); see prompt_builder
+        self._dirty       = 0               # bit i set: FIELDS[i] changed since the last commit
+        self._deferred    = False
+
+    @property
+    def data(self) -> ContextView:
+        return ContextView(self)
+
+    def update(self, key: str, val):
+        i = _INDEX.get(key)
+        if i is None:
             raise KeyError(f"Invalid context key: {key}")
-        self.data[key] = value
+        setattr(self, key, val)
+        self.version += 1
+        self._dirty  |= 1 << i
+        if not self._deferred:
+            self.commit()
+
+    # ---- dirty tracking & journaling ----
+    def changed(self) -> dict:
+        """Fields updated since the last commit."""
+        return {name: getattr(self, name) for i, name in enumerate(FIELDS) if self._dirty >> i & 1}
 
-    def __delitem__(self, key):
-        raise KeyError("Cannot delete context keys")
+    def commit(self):
+        """Journals the dirty fields as one delta and marks them clean."""
+        if self._dirty and self.journal is not None:
+            self.journal("context", self.to_bytes(self._dirty))
+        self._dirty = 0
 
-    def __iter__(self):
-        return iter(self.data)
+    @contextmanager
+    def deferred(self):
+        """Holds journal writes until the block ends, then commits once."""
+        outer, self._deferred = self._deferred, True
+        try:
+            yield self
+        finally:
+            self._deferred = outer
+            if not outer:
+                self.commit()
+
+    # ---- binary serialisation ----
+    def to_bytes(self, mask: int = _ALL) -> bytes:
+        """The fields in `mask` (default: all) in the compact binary format."""
+        parts = [_HEADER.pack(_FORMAT, mask)]
+        for i, name in enumerate(FIELDS):
+            if mask >> i & 1:
+                parts.append(_encode(getattr(self, name)))
+        return b"".join(parts)
+
+    def load_bytes(self, blob: bytes) -> int:
+        """Applies a snapshot or delta without journaling; returns its field mask."""
+        fmt, mask = _HEADER.unpack_from(blob)
+        if fmt != _FORMAT:
+            raise ValueError(f"Unknown context format {fmt}")
+        pos = _HEADER.size
+        for i, name in enumerate(FIELDS):
+            if mask >> i & 1:
+                value, pos = _decode(blob, pos)
+                setattr(self, name, value)
+        self.version += 1
+        return mask
+
+    @classmethod
+    def from_bytes(cls, blob: bytes, journal=None) -> "ConversationContext":
+        ctx = cls(journal)
+        ctx.load_bytes(blob)
+        return ctx
+
+    def load(self, fields: dict):
+        """Applies {key: value} without journaling (e.g. replayed JSON events)."""
+        for key, val in fields.items():
+            if key in _INDEX:               # fields dropped from the schema are ignored
+                setattr(self, key, val)
+        self.version += 1
+
+    # ---- MutableMapping / dict-like interface ----
+    def __getitem__(self, key):
+        if key not in _INDEX:
+            raise KeyError(key)
+        return getattr(self, key)
 
-    def __len__(self):
-        return len(self.data)
+    def __setitem__(self, key, v): self.update(key, v)
+    def __delitem__(self, key):    raise KeyError("Cannot delete keys")
+    def __iter__(self):            return iter(FIELDS)
+    def __len__(self):             return len(FIELDS)
 
     def get(self, key, default=None):
-        return self.data.get(key, default)
+        return getattr(self, key) if key in _INDEX else default
 
     # ---- convenience methods ----
     def is_ready_for_ai(self):
-        return self.data["script_complete"]
+        return self.script_complete
 
     def dump_context(self):
-        return "\n".join(f"{k}: {v}"
-                         for k, v in self.data.items()
-                         if v is not False and v is not None)
+        values = (getattr(self, k) for k in FIELDS)
+        return "\n".join(
+            f"{k}: {v}" for k, v in zip(FIELDS, values)
+            if v not in (None, False)
+        )
@@ -1,34 +1,208 @@
 # core/conversation_manager.py
 
-from config import MESSAGE_BUFFER_SIZE
+import asyncio
+import logging
+import re
+import threading
+import uuid
+from collections import deque
+
+from config import (
+    MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_ENABLED,
+    STAGE_BUFFER_RAW, STAGE_BUFFER_CONDENSED,
+)
+from core.event_loop import get_loop
+from services.semantic_cache import STOPWORDS
+from services.tokens import TOKENS_PER_MESSAGE, count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Eviction order when the window is over budget: LOW first (scripted
+# prompts like "What's your postcode?"), then NORMAL; PINNED never.
+PRIORITY_LOW    = 0
+PRIORITY_NORMAL = 1
+PRIORITY_PINNED = 2
+
+# Stage buffer bounds: raw turns are clipped, older turns shrink to content words
+STAGE_TURN_MAX_CHARS  = 300
+STAGE_CONDENSED_WORDS = 12
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+def _condense(text: str) -> str:
+    words = _WORD.findall(text.lower())
+    words = [w for w in words if w not in STOPWORDS] or words
+    return " ".join(words[:STAGE_CONDENSED_WORDS])
 
 class ConversationManager:
     """
-    Keeps the last MESSAGE_BUFFER_SIZE messages for LLM context,
-    and separately tracks all user inputs for the current stage.
+    Keeps a window of recent messages bounded by MEMORY_TOKEN_BUDGET for
+    LLM context plus a rolling summary of everything evicted, and
+    separately tracks user inputs for the current stage. Token counts
+    are computed once per message and kept as a running total.
+
+    The stage buffer holds the last STAGE_BUFFER_RAW inputs verbatim and
+    condenses older ones to a few content words each, keeping at most
+    STAGE_BUFFER_CONDENSED of those, so get_stage_digest() stays the same
+    size however long the stage runs.
+
+    Evicted messages are folded into the summary by a background task on
+    the shared event loop, so summarising never delays the user's turn.
+    Until a fold lands, the evicted messages are still returned raw.
+
+    With a ``journal`` callable(kind, payload), every change is also
+    appended to the session store so replay() can rebuild the manager.
+    ``session_id`` identifies the conversation in logs and the store.
     """
-    def __init__(self):
-        self.messages            = []
-        self.stage_user_messages = []
+    def __init__(self, summarise=None, journal=None, session_id: str = None):
+        self.session_id          = session_id or uuid.uuid4().hex
+        self.messages            = []       # {"role", "content", "tokens", "priority"}
+        self.window_tokens       = 0
+        self.stage_user_messages = deque(maxlen=STAGE_BUFFER_RAW)
+        self._stage_condensed    = deque(maxlen=STAGE_BUFFER_CONDENSED)
+        self._stage_dropped      = 0        # stage inputs no longer in the digest
+        self._stage_digest       = None
+        self.summary             = ""
+        self._pending            = []       # evicted, not yet in the summary
+        self._summarising        = False
+        self._lock               = threading.Lock()
+        self._summarise          = summarise
+        self.journal             = journal
 
     def add_user_message(self, text: str):
-        self.messages.append({"role": "user", "content": text})
-        self.stage_user_messages.append(text)
+        self._record("user", {"text": text})
+        self._append("user", text, PRIORITY_NORMAL)
+        self._add_stage_message(text)
         self._trim()
 
-    def add_assistant_message(self, text: str):
-        self.messages.append({"role": "assistant", "content": text})
+    def add_assistant_message(self, text: str, priority: int = PRIORITY_NORMAL):
+        self._record("assistant", {"text": text, "priority": priority})
+        self._append("assistant", text, priority)
         self._trim()
 
+    def replay(self, kind: str, payload: dict):
+        """Applies one journaled event without re-journaling it or calling the LLM."""
+        if kind == "user":
+            self._append("user", payload["text"], PRIORITY_NORMAL)
+            self._add_stage_message(payload["text"])
+            self._evict()
+        elif kind == "assistant":
+            self._append("assistant", payload["text"], payload["priority"])
+            self._evict()
+        elif kind == "stage_reset":
+            self._clear_stage()
+        elif kind == "summary":
+            self.summary  = payload["text"]
+            self._pending = self._pending[payload["folded"]:]
+
+    def _record(self, kind: str, payload: dict):
+        if self.journal is not None:
+            self.journal(kind, payload)
+
+    def _append(self, role: str, text: str, priority: int):
+        tokens = TOKENS_PER_MESSAGE + count_tokens(text)
+        self.messages.append({"role": role, "content": text, "tokens": tokens, "priority": priority})
+        self.window_tokens += tokens
+
     def _trim(self):
-        if len(self.messages) > MESSAGE_BUFFER_SIZE:
-            self.messages = self.messages[-MESSAGE_BUFFER_SIZE:]
+        if not self._evict():
+            return
+        with self._lock:
+            if self._summarising:
+                return                      # the running fold picks these up
+            self._summarising = True
+        asyncio.run_coroutine_threadsafe(self._fold_pending(), get_loop())
+
+    def _evict(self) -> bool:
+        """Drops messages over the token budget into the pending list."""
+        evicted = []
+        while self.window_tokens > MEMORY_TOKEN_BUDGET:
+            idx = self._eviction_candidate()
+            if idx is None:
+                break
+            msg = self.messages.pop(idx)
+            self.window_tokens -= msg["tokens"]
+            evicted.append(msg)
+        if not evicted or not MEMORY_SUMMARY_ENABLED:
+            return False
+        with self._lock:
+            self._pending.extend(evicted)
+        return True
+
+    async def _fold_pending(self):
+        if self._summarise is None:
+            from services.summariser import fold_into_summary
+            self._summarise = fold_into_summary
+        while True:
+            with self._lock:
+                batch = list(self._pending)
+                if not batch:
+                    self._summarising = False
+                    return
+            try:
+                summary = await self._summarise(self.summary, batch, session_id=self.session_id)
+            except Exception:
+                # Keep the batch raw; the next eviction retries the fold
+                logger.exception("rolling summary update failed")
+                with self._lock:
+                    self._summarising = False
+                return
+            with self._lock:
+                self.summary  = summary
+                self._pending = self._pending[len(batch):]
+            # A journal append commits to SQLite; keep it off the event loop
+            await asyncio.to_thread(self._record, "summary", {"text": summary, "folded": len(batch)})
+
+    def _eviction_candidate(self):
+        """Index of the oldest lowest-priority message, never the newest one."""
+        for priority in (PRIORITY_LOW, PRIORITY_NORMAL):
+            for idx, msg in enumerate(self.messages[:-1]):
+                if msg["priority"] == priority:
+                    return idx
+        return None
 
     def get_last_messages(self):
-        return list(self.messages)
+        with self._lock:
+            older = list(self._pending)
+            summary = self.summary
+        head = [{"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}] if summary else []
+        return head + [
+            {"role": m["role"], "content": m["content"]} for m in older + self.messages
+        ]
+
+    def _add_stage_message(self, text: str):
+        raw = self.stage_user_messages
+        if len(raw) == raw.maxlen:
+            if len(self._stage_condensed) == self._stage_condensed.maxlen:
+                self._stage_dropped += 1
+            self._stage_condensed.append(_condense(raw[0]))
+        raw.append(text[:STAGE_TURN_MAX_CHARS])
+        self._stage_digest = None
+
+    def _clear_stage(self):
+        self.stage_user_messages.clear()
+        self._stage_condensed.clear()
+        self._stage_dropped = 0
+        self._stage_digest  = None
 
     def get_stage_messages(self):
+        """The most recent stage inputs, verbatim (clipped)."""
         return list(self.stage_user_messages)
 
+    def get_stage_digest(self) -> str:
+        """Bounded text of the whole stage; rebuilt only after a new input."""
+        if self._stage_digest is None:
+            parts = []
+            if self._stage_dropped:
+                parts.append(f"({self._stage_dropped} earlier messages omitted)")
+            if self._stage_condensed:
+                parts.append("Earlier (condensed):\n"
+                             + "\n".join(f"- {c}" for c in self._stage_condensed))
+                parts.append("Most recent:")
+            parts.extend(self.stage_user_messages)
+            self._stage_digest = "\n".join(parts)
+        return self._stage_digest
+
     def reset_stage_messages(self):
-        self.stage_user_messages = []
+        self._record("stage_reset", {})
+        self._clear_stage()
@@ -0,0 +1,44 @@
+# core/event_loop.py
+
+import asyncio
+import threading
+
+# One long-lived loop for sync callers (main.py, Streamlit script runs),
+# so the async OpenAI client and its connection pool stay bound to a
+# single loop instead of a fresh asyncio.run() per call.
+_loop = None
+_loop_lock = threading.Lock()
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=_loop.run_forever, name="smile-bot-loop", daemon=True
+            ).start()
+    return _loop
+
+def run_sync(coro):
+    """
+    Run a coroutine on the shared loop and block until it finishes.
+    Must not be called from a coroutine already running on that loop.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result()
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+def iter_sync(agen):
+    """
+    Drive an async generator on the shared loop, yielding its items
+    to a plain synchronous for-loop.
+    """
+    try:
+        while True:
+            try:
+                yield run_sync(_anext(agen))
+            except StopAsyncIteration:
+                return
+    finally:
+        run_sync(agen.aclose())
@@ -1,46 +1,228 @@
 # core/logger.py
 # -----------------
+# Append-only JSON-lines logging. Callers only enqueue a dict (a few
+# microseconds); a background thread serialises, appends and flushes in
+# batches, and rotates the file by size or age.
+import atexit
+import json
 import logging
 import os
+import queue
+import sys
+import threading
+import time
+import uuid
 from datetime import datetime
 from collections import deque
-from config import MESSAGE_BUFFER_SIZE
+from core import metrics
+from config import (
+    MESSAGE_BUFFER_SIZE,
+    LOG_PATH, LOG_MAX_BYTES, LOG_ROTATE_SECS, LOG_BACKUPS, LOG_BATCH_SIZE,
+)
 
-# Ensure log directory
-os.makedirs("logs", exist_ok=True)
+LOG_LINES   = metrics.counter("smilebot_log_lines_total", "Log lines written", ["result"])
+LOG_BATCHES = metrics.counter("smilebot_log_batches_total", "Batched log writes (one flush each)")
 
-# Configure root logger
-logging.basicConfig(
-    filename="logs/conversation.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s",
-    encoding="utf-8"
-)
-logger = logging.getLogger()
+_TRUNCATE = object()                        # queue marker: empty the current file
+
+class JsonLineWriter:
+    """
+    Background writer for one JSON-lines file. write() never touches the
+    disk; everything queued since the last batch is written with one
+    flush. The file rotates to `<name>.<timestamp>` once it exceeds
+    `max_bytes` or is older than `rotate_secs`, keeping `backups` old files.
+    """
+
+    def __init__(self, path: str, max_bytes: int, rotate_secs: float,
+                 backups: int, batch_size: int = 512):
+        self.path        = path
+        self.max_bytes   = max_bytes
+        self.rotate_secs = rotate_secs
+        self.backups     = backups
+        self.batch_size  = batch_size
+        self.written     = 0
+        self.batches     = 0
+        self._queue      = queue.SimpleQueue()
+        self._file       = None
+        self._opened_at  = 0.0
+        self._thread     = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: dict):
+        self._queue.put(record)
+
+    def depth(self) -> int:
+        """Lines queued but not yet written."""
+        return self._queue.qsize()
+
+    def flush(self, timeout: float = 5.0):
+        """Blocks until everything queued so far is on disk."""
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def truncate(self, timeout: float = 5.0):
+        """Empties the current file once everything queued before the call is written."""
+        self._queue.put(_TRUNCATE)
+        self.flush(timeout)
+
+    def close(self):
+        self.flush()
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = self._write_batch(batch)
+            if stop:
+                if self._file:
+                    self._file.close()
+                return
+
+    def _write_batch(self, batch: list) -> bool:
+        lines, waiters, stop = [], [], False
+        for item in batch:
+            if item is None:
+                stop = True
+            elif isinstance(item, threading.Event):
+                waiters.append(item)
+            elif item is _TRUNCATE:
+                self._write_lines(lines)
+                lines = []
+                self._truncate()
+            else:
+                lines.append(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+        self._write_lines(lines)
+        for w in waiters:
+            w.set()
+        return stop
 
-# In-memory buffer
-log_history = deque(maxlen=MESSAGE_BUFFER_SIZE)
+    def _write_lines(self, lines: list):
+        if not lines:
+            return
+        try:
+            f = self._current_file()
+            f.write("".join(lines))
+            f.flush()
+            self.written += len(lines)
+            self.batches += 1
+            LOG_LINES.labels(result="written").inc(len(lines))
+            LOG_BATCHES.inc()
+        except OSError as e:
+            LOG_LINES.labels(result="dropped").inc(len(lines))
+            # Nowhere better to report it; never let the writer thread die
+            print(f"[logger] dropped {len(lines)} log lines: {e}", file=sys.stderr)
 
-def log_interaction(user_input: str, agent_name: str, response: str, response_time: float):
+    def _truncate(self):
+        # Runs on the writer thread, so the next write reopens at offset 0
+        # with a fresh rotation clock
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            open(self.path, "w", encoding="utf-8").close()
+        except OSError as e:
+            print(f"[logger] could not clear {self.path}: {e}", file=sys.stderr)
+
+    def _current_file(self):
+        if self._file is not None:
+            too_big = self._file.tell() >= self.max_bytes
+            too_old = time.time() - self._opened_at >= self.rotate_secs
+            if too_big or too_old:
+                self._rotate()
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file      = open(self.path, "a", encoding="utf-8")
+            self._opened_at = time.time()
+        return self._file
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if os.path.getsize(self.path) == 0:
+            return
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        os.replace(self.path, f"{self.path}.{stamp}")
+        head, base = os.path.split(self.path)
+        old = sorted(n for n in os.listdir(head or ".") if n.startswith(base + "."))
+        for name in old[:-self.backups] if self.backups else old:
+            os.remove(os.path.join(head, name))
+
+class JsonLineHandler(logging.Handler):
+    """Routes stdlib `logging` records into the same JSON-lines stream."""
+
+    def __init__(self, writer: JsonLineWriter):
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record: logging.LogRecord):
+        entry = {
+            "ts":     record.created,
+            "kind":   "log",
+            "level":  record.levelname,
+            "logger": record.name,
+            "msg":    record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = logging.Formatter().formatException(record.exc_info)
+        self.writer.write(entry)
+
+writer = JsonLineWriter(LOG_PATH, LOG_MAX_BYTES, LOG_ROTATE_SECS, LOG_BACKUPS, LOG_BATCH_SIZE)
+atexit.register(writer.close)
+metrics.gauge("smilebot_log_queue_depth", "Log lines queued for the writer thread") \
+    .set_function(writer.depth)
+
+# Module loggers (llm_service, readiness_classifier, ...) go to the same file
+_root = logging.getLogger()
+if not any(isinstance(h, JsonLineHandler) for h in _root.handlers):
+    _root.addHandler(JsonLineHandler(writer))
+    _root.setLevel(logging.INFO)
+    # httpx logs every request at INFO; keep only their warnings and errors
+    for _name in ("httpx", "httpcore", "openai"):
+        logging.getLogger(_name).setLevel(logging.WARNING)
+
+def log_event(kind: str, **fields):
+    """Queue one structured log line; returns immediately."""
+    fields["ts"]   = time.time()
+    fields["kind"] = kind
+    writer.write(fields)
+
+def new_turn_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+class SessionLog:
     """
-    Append to in-memory log and overwrite the file with the last N entries.
+    One conversation's log sink. Every line carries the session id (and
+    the turn id, when given) so a turn can be traced end to end with
+    `grep <turn_id>`, and recent turns sit in this session's own buffer
+    rather than one shared by every user in the process. Lines go
+    through the writer's queue, so logging takes no lock of its own.
     """
-    entry = (
-        f"Time: {datetime.now().isoformat()}\n"
-        f"User: {user_input}\n"
-        f"{agent_name}: {response}\n"
-        f"Response Time: {response_time:.2f}s\n"
-        "----------------------------------------"
-    )
-    log_history.append(entry)
-    logger.info(entry)
-
-    # Flush to disk
-    with open("logs/conversation.log", "w", encoding="utf-8") as f:
-        f.write("\n".join(log_history))
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.history    = deque(maxlen=MESSAGE_BUFFER_SIZE)
+
+    def event(self, kind: str, turn_id: str = None, **fields):
+        log_event(kind, session_id=self.session_id, turn_id=turn_id, **fields)
+
+    def interaction(self, turn_id: str, user_input: str, agent_name: str,
+                    response: str, response_time: float):
+        entry = {
+            "user":          user_input,
+            "agent":         agent_name,
+            "response":      response,
+            "response_time": round(response_time, 4),
+        }
+        self.history.append(entry)
+        self.event("turn", turn_id, **entry)
 
 def clear_log():
-    """Wipe both in-memory and disk logs."""
-    log_history.clear()
-    with open("logs/conversation.log", "w", encoding="utf-8") as f:
-        f.write("")
+    """Start a fresh log file."""
+    writer.truncate()
@@ -0,0 +1,125 @@
+# core/session_store.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from functools import partial
+
+from config import SESSION_STORE_ENABLED, SESSION_STORE_PATH
+
+class SessionStore:
+    """
+    Append-only journal of conversations in a SQLite WAL database.
+
+    Every message, context update, stage reset and summary fold is one row
+    keyed by (session_id, seq), so an append is a single insert and a
+    resume is one range scan of the primary key. Replaying the rows
+    rebuilds ConversationManager and ConversationContext exactly, including
+    the rolling summary, without calling the LLM again.
+
+    Each row also gets a store-wide `id`, allocated inside the inserting
+    write transaction, so ids become visible in increasing order even with
+    several processes appending. Readers that follow the journal (the log
+    index) keep their place by id rather than by timestamp.
+    """
+
+    def __init__(self, path: str):
+        self.path  = path
+        self._seq  = {}                     # session_id -> last seq written
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " session_id TEXT PRIMARY KEY, created_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " session_id TEXT NOT NULL, seq INTEGER NOT NULL, at REAL NOT NULL,"
+            " kind TEXT NOT NULL, payload TEXT NOT NULL, id INTEGER NOT NULL,"
+            " PRIMARY KEY (session_id, seq)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE UNIQUE INDEX IF NOT EXISTS events_id ON events (id)")
+        self._db.commit()
+
+    def new_session(self) -> str:
+        session_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO sessions (session_id, created_at) VALUES (?, ?)",
+                (session_id, time.time())
+            )
+            self._db.commit()
+            self._seq[session_id] = 0
+        return session_id
+
+    def append(self, session_id: str, kind: str, payload):
+        # dicts are stored as JSON; bytes (context deltas) as-is
+        blob = payload if isinstance(payload, bytes) else \
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            seq = self._seq.get(session_id)
+            if seq is None:
+                seq = self._last_seq(session_id)
+            seq += 1
+            self._db.execute(
+                "INSERT INTO events (session_id, seq, at, kind, payload, id)"
+                " SELECT ?, ?, ?, ?, ?, COALESCE(MAX(id), 0) + 1 FROM events",
+                (session_id, seq, time.time(), kind, blob)
+            )
+            self._db.commit()
+            self._seq[session_id] = seq
+
+    def journal(self, session_id: str):
+        """Callable(kind, payload) for ConversationManager/ConversationContext."""
+        return partial(self.append, session_id)
+
+    def events(self, session_id: str):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT kind, payload FROM events WHERE session_id = ? ORDER BY seq",
+                (session_id,)
+            ).fetchall()
+        return [(kind, payload if isinstance(payload, bytes) else json.loads(payload))
+                for kind, payload in rows]
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return row is not None
+
+    def restore(self, session_id: str, manager, context) -> list:
+        """
+        Replays a session into a fresh manager and context, then attaches
+        the journal so new events keep appending. Returns the full
+        transcript as (role, text) pairs.
+        """
+        transcript = []
+        for kind, payload in self.events(session_id):
+            if kind == "context":
+                if isinstance(payload, bytes):
+                    context.load_bytes(payload)
+                else:                       # sessions journaled one JSON key at a time
+                    context.load({payload["key"]: payload["value"]})
+                continue
+            if kind in ("user", "assistant"):
+                transcript.append((kind, payload["text"]))
+            manager.replay(kind, payload)
+        manager.journal = context.journal = self.journal(session_id)
+        return transcript
+
+    def _last_seq(self, session_id: str) -> int:
+        row = self._db.execute(
+            "SELECT MAX(seq) FROM events WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] or 0
+
+session_store = SessionStore(SESSION_STORE_PATH) if SESSION_STORE_ENABLED else None
@@ -0,0 +1,78 @@
+# core/timing.py
+
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from core import metrics
+
+def _pick(ordered: list, pct: float) -> float:
+    return ordered[min(len(ordered) - 1, int(pct / 100.0 * len(ordered)))]
+
+class RollingWindow:
+    """The last `size` samples (seconds), with percentiles over them."""
+
+    def __init__(self, size: int = 500):
+        self.samples = deque(maxlen=size)
+        self.count   = 0                 # all-time, not just the window
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, pct: float, min_samples: int = 1):
+        if len(self.samples) < min_samples:
+            return None
+        return _pick(sorted(self.samples), pct)
+
+# (agent, stage) -> window. Stages: turn, first_chunk, scripted,
+# llm:<purpose>, llm_ttft:<purpose>, email, summary
+_windows = defaultdict(RollingWindow)
+_lock    = threading.Lock()
+
+STAGE_SECONDS = metrics.histogram(
+    "smilebot_stage_seconds",
+    "Wall time per agent and stage (turn, first_chunk, llm:<purpose>, email, ...)",
+    ["agent", "stage"],
+)
+
+def record(agent: str, stage: str, seconds: float):
+    agent = agent or "unknown"
+    with _lock:
+        _windows[(agent, stage)].add(seconds)
+    STAGE_SECONDS.labels(agent=agent, stage=stage).observe(seconds)
+
+@contextmanager
+def timed(agent: str, stage: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(agent, stage, time.perf_counter() - started)
+
+def snapshot() -> list:
+    """One row per (agent, stage): count and p50/p95/p99/max in seconds."""
+    with _lock:
+        items = [(k, list(w.samples), w.count) for k, w in sorted(_windows.items())]
+    rows = []
+    for (agent, stage), samples, count in items:
+        ordered = sorted(samples)
+        rows.append({
+            "agent": agent, "stage": stage, "count": count,
+            "p50": _pick(ordered, 50), "p95": _pick(ordered, 95),
+            "p99": _pick(ordered, 99), "max": ordered[-1],
+        })
+    return rows
+
+def format_snapshot() -> str:
+    rows = snapshot()
+    if not rows:
+        return "No timings recorded yet."
+    lines = [f"{'agent':<14}{'stage':<26}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}"]
+    for r in rows:
+        lines.append(
+            f"{r['agent']:<14}{r['stage']:<26}{r['count']:>7}"
+            f"{r['p50']:>8.3f}s{r['p95']:>8.3f}s{r['p99']:>8.3f}s{r['max']:>8.3f}s"
+        )
+    return "\n".join(lines)
@@ -1,22 +1,41 @@
-from ui.context_handler        import collect_user_context
+import sys
+
+from ui.context_handler        import collect_user_context, ConversationContext
 from agents.candidatebot       import CandidateBot
 from agents.schoolbot          import SchoolBot
 from agents.generalbot         import GeneralBot
+from core.conversation_manager import ConversationManager
+from core.session_store        import session_store
+from core                      import metrics
 from ui.chat_loop              import run_chat_loop
 from services.prompt_builder   import build_prompt
 from services.email_service    import EmailService
 
 def main():
     print("\n🎓 Welcome to Smile Education's Virtual Assistant!\n")
+    metrics.start_server()
 
-    # 1) Decide which flow
-    context      = collect_user_context()
-    conv_manager = ConversationManager()
+    # 1) Resume a stored session (python main.py <session_id>) or decide which flow
+    resume_id  = sys.argv[1] if len(sys.argv) > 1 else None
+    transcript = None
+    if resume_id and session_store and session_store.exists(resume_id):
+        context      = ConversationContext()
+        conv_manager = ConversationManager(session_id=resume_id)
+        transcript   = session_store.restore(resume_id, conv_manager, context)
+        print(f"(resumed session {resume_id})")
+    else:
+        journal, session_id = None, None
+        if session_store:
+            session_id = session_store.new_session()
+            journal    = session_store.journal(session_id)
+            print(f"(session {session_id}; run `python main.py {session_id}` to resume)\n")
+        context      = collect_user_context(journal)
+        conv_manager = ConversationManager(journal=journal, session_id=session_id)
 
     # 2) Build the LLM system prompt
     system_prompt = build_prompt(
         user_type=context.get("user_type"),
-        context=context.data
+        context=context
     )
 
     # 3) Instantiate the appropriate agent
@@ -27,10 +46,10 @@ def main():
         agent = SchoolBot(conv_manager, system_prompt, context, email_svc)
     else:
         # pass context so GeneralBot can triage
-        agent = GeneralBot(conv_manager, system_prompt, context)
+        agent = GeneralBot(conv_manager, system_prompt, context, greeted=bool(transcript))
 
     # 4) Run the chat loop
-    run_chat_loop(agent, context)
+    run_chat_loop(agent, context, transcript)
 
 if __name__ == "__main__":
     main()
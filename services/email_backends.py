@@ -0,0 +1,234 @@
+# services/email_backends.py
+#
+# Where queued emails go. EMAIL_BACKEND picks one:
+#   file - JSON files in the message store only (the default, no network)
+#   smtp - the same files, plus real delivery over pooled SMTP connections
+# Benchmark against a local sink (python -m services.smtp_sink):
+#   python -m services.email_backends --bench 2000
+
+import argparse
+import queue
+import smtplib
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+from config import (
+    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SMTP_STARTTLS,
+    SMTP_FROM, SMTP_POOL_SIZE, SMTP_TIMEOUT,
+)
+from core import metrics
+from core.logger import log_event
+from services.message_store import email_store
+from services.outbox import PermanentDeliveryError
+
+SMTP_MESSAGES = metrics.counter(
+    "smilebot_smtp_messages_total", "SMTP sends by result (sent, transient, permanent)", ["result"]
+)
+SMTP_CONNECTS = metrics.counter("smilebot_smtp_connections_total", "SMTP connections opened")
+
+SUBJECTS = {
+    "upload_form":    "Complete your Smile Education registration",
+    "candidate_list": "Your Smile Education candidate shortlist",
+    "booking_portal": "Book your interviews with Smile Education",
+}
+
+class EmailBackend(ABC):
+    name = "email"
+
+    @abstractmethod
+    def deliver_many(self, items: list) -> list:
+        """
+        items: [(kind, payload), ...] from the outbox. Returns one entry per
+        item: None if delivered, else the exception (PermanentDeliveryError
+        to stop retrying).
+        """
+
+class FileEmailBackend(EmailBackend):
+    """Writes each message to the sharded message store."""
+    name = "file"
+
+    def deliver_many(self, items: list) -> list:
+        results = []
+        for kind, payload in items:
+            try:
+                email_store.write(payload["message_id"], payload["path"], payload["message"]["to"],
+                                  kind, payload["message"], payload["session_id"])
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+class SMTPPool:
+    """
+    Up to `size` persistent SMTP connections, reused across messages and
+    batches. A connection that drops is discarded and the send retried
+    once on a fresh one; 5xx replies are permanent, 4xx and network
+    errors transient.
+    """
+
+    def __init__(self, host: str, port: int, size: int = 4, username: str = None,
+                 password: str = None, starttls: bool = False, timeout: float = 10.0):
+        self.host, self.port = host, port
+        self.size     = size
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout  = timeout
+        self._idle    = queue.LifoQueue()
+        self._slots   = threading.BoundedSemaphore(size)
+        self._workers = ThreadPoolExecutor(max_workers=size, thread_name_prefix="smtp")
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username:
+            conn.login(self.username, self.password)
+        SMTP_CONNECTS.inc()
+        return conn
+
+    @contextmanager
+    def connection(self, fresh: bool = False):
+        with self._slots:
+            try:
+                conn = None if fresh else self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+            if conn is None:
+                conn = self._connect()
+            try:
+                yield conn
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                # The server answered, so the session is still usable (smtplib
+                # has already sent RSET) unless it hung up on us (421)
+                self._release(conn)
+                raise
+            except OSError:                 # includes SMTPServerDisconnected
+                _close(conn)
+                raise
+            except BaseException:
+                # Anything else (a bad header, an interrupted send) leaves the
+                # session in an unknown state: close it so the slot is freed
+                _close(conn)
+                raise
+            self._release(conn)
+
+    def _release(self, conn: smtplib.SMTP):
+        if conn.sock is not None:
+            self._idle.put(conn)
+
+    def send(self, msg: EmailMessage):
+        for attempt in range(2):
+            try:
+                with self.connection(fresh=attempt > 0) as conn:
+                    conn.send_message(msg)
+                SMTP_MESSAGES.labels(result="sent").inc()
+                return
+            except smtplib.SMTPRecipientsRefused as e:
+                codes = [code for code, _ in e.recipients.values()]
+                return self._refused(min(codes), e)
+            except smtplib.SMTPResponseException as e:
+                return self._refused(e.smtp_code, e)
+            except OSError:
+                # Stale pooled connection or network blip: one immediate retry
+                # on a fresh connection, then leave it to the outbox's backoff
+                if attempt:
+                    SMTP_MESSAGES.labels(result="transient").inc()
+                    raise
+
+    def _refused(self, code: int, exc: Exception):
+        if code >= 500:
+            SMTP_MESSAGES.labels(result="permanent").inc()
+            raise PermanentDeliveryError(f"SMTP {code}: {exc}") from exc
+        SMTP_MESSAGES.labels(result="transient").inc()
+        raise exc
+
+    def send_many(self, messages: list) -> list:
+        """Sends across the pool's connections; one result per message."""
+        def attempt(msg):
+            try:
+                self.send(msg)
+                return None
+            except Exception as e:
+                return e
+        return list(self._workers.map(attempt, messages))
+
+    def close(self):
+        while True:
+            try:
+                _close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+def _close(conn: smtplib.SMTP):
+    try:
+        conn.quit()
+    except Exception:
+        conn.close()
+
+def build_message(kind: str, message: dict, sender: str = SMTP_FROM) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"]    = sender
+    msg["To"]      = message["to"]
+    msg["Subject"] = SUBJECTS.get(kind, "A message from Smile Education")
+    if kind == "upload_form":
+        body = (f"Please upload your documents here: {message['upload_link']}\n\n"
+                f"What we have so far:\n{message['summary']}\n")
+    else:
+        body = f"{message['candidates']}\n"
+    msg.set_content(body)
+    return msg
+
+class SMTPEmailBackend(EmailBackend):
+    """Keeps the message-store copy, then sends the batch over the pool."""
+    name = "smtp"
+
+    def __init__(self, pool: SMTPPool):
+        self.pool  = pool
+        self.files = FileEmailBackend()
+
+    def deliver_many(self, items: list) -> list:
+        results = self.files.deliver_many(items)
+        todo    = [i for i, r in enumerate(results) if r is None]
+        started = time.perf_counter()
+        sent    = self.pool.send_many([build_message(items[i][0], items[i][1]["message"]) for i in todo])
+        elapsed = time.perf_counter() - started
+        for i, r in zip(todo, sent):
+            results[i] = r
+        ok = sum(r is None for r in sent)
+        log_event("smtp_batch", messages=len(todo), sent=ok, secs=round(elapsed, 4),
+                  per_sec=round(ok / elapsed, 1) if elapsed else None)
+        return results
+
+def make_email_backend(name: str) -> EmailBackend:
+    if name == "file":
+        return FileEmailBackend()
+    if name == "smtp":
+        return SMTPEmailBackend(SMTPPool(SMTP_HOST, SMTP_PORT, SMTP_POOL_SIZE, SMTP_USER,
+                                         SMTP_PASSWORD, SMTP_STARTTLS, SMTP_TIMEOUT))
+    raise ValueError(f"Unknown EMAIL_BACKEND {name!r} (expected file or smtp)")
+
+def main():
+    p = argparse.ArgumentParser(description="SMTP delivery throughput against SMTP_HOST:SMTP_PORT")
+    p.add_argument("--bench", type=int, default=1000, help="messages to send")
+    p.add_argument("--batch", type=int, default=50)
+    args = p.parse_args()
+
+    pool = SMTPPool(SMTP_HOST, SMTP_PORT, SMTP_POOL_SIZE, SMTP_USER, SMTP_PASSWORD,
+                    SMTP_STARTTLS, SMTP_TIMEOUT)
+    message = {"to": "bench@example.com", "candidates": "Candidate A\nCandidate B"}
+    started, failed = time.perf_counter(), 0
+    for start in range(0, args.bench, args.batch):
+        n = min(args.batch, args.bench - start)
+        failed += sum(r is not None for r in pool.send_many([build_message("candidate_list", message)] * n))
+    elapsed = time.perf_counter() - started
+    pool.close()
+    print(f"{args.bench - failed}/{args.bench} sent over {SMTP_POOL_SIZE} connections "
+          f"in {elapsed:.2f}s: {(args.bench - failed) / elapsed:.0f} msg/s")
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,73 @@
 # services/email_service.py
 
-import os, json
+import atexit
+
+from config import EMAIL_OUTBOX_PATH, EMAIL_BATCH_SIZE, EMAIL_BACKEND
+from core import metrics
+from core.logger import log_event
+from services.email_backends import make_email_backend
+from services.message_store import email_store
+from services.outbox import Outbox
+
+EMAILS_SENT = metrics.counter("smilebot_emails_total", "Emails sent by template", ["template"])
+
+backend = make_email_backend(EMAIL_BACKEND)
+
+def _deliver(items: list) -> list:
+    """Outbox worker: hands a batch to the configured backend."""
+    results = backend.deliver_many(items)
+    for (kind, payload), error in zip(items, results):
+        if error is None:
+            log_event("email", session_id=payload["session_id"], turn_id=payload["turn_id"],
+                      template=kind, to=payload["message"]["to"], path=payload["path"],
+                      message_id=payload["message_id"], backend=backend.name)
+            EMAILS_SENT.labels(template=kind).inc()
+    return results
+
+outbox = Outbox("email", EMAIL_OUTBOX_PATH, _deliver, EMAIL_BATCH_SIZE)
+atexit.register(outbox.flush, 2.0)
 
 class EmailService:
     """
-    Simulates emails by writing JSON files to emails/.
+    Writes one JSON file per message to the sharded store under emails/
+    (see services/message_store.py) and, with EMAIL_BACKEND=smtp, also
+    mails it. Sends go through a durable outbox and return as soon as they
+    are queued; a session sends each kind of email at most once, however
+    often the turn is re-run.
     """
 
     def __init__(self, upload_link="https://example.com/selection-portal"):
         self.upload_link = upload_link
 
-    def send_upload_form(self, to_address: str, context_summary: str) -> str:
-        os.makedirs("emails", exist_ok=True)
-        fname = to_address.replace("@","_at_").replace(" ","_")
-        path  = f"emails/{fname}.json"
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({
-                "to":          to_address,
-                "upload_link": self.upload_link,
-                "summary":     context_summary
-            }, f, indent=2)
+    def send_upload_form(self, to_address: str, context_summary: str,
+                         session_id: str=None, turn_id: str=None) -> str:
+        self._enqueue("upload_form", to_address, {
+            "to":          to_address,
+            "upload_link": self.upload_link,
+            "summary":     context_summary,
+            "session_id":  session_id
+        }, session_id, turn_id)
         return self.upload_link
 
-    def send_candidate_list(self, to_address: str, candidate_profiles: str) -> str:
-        os.makedirs("emails", exist_ok=True)
-        fname = to_address.replace("@","_at_").replace(" ","_")
-        path  = f"emails/{fname}_candidates.json"
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump({
-                "to":         to_address,
-                "candidates": candidate_profiles
-            }, f, indent=2)
+    def send_candidate_list(self, to_address: str, candidate_profiles: str,
+                            session_id: str=None, turn_id: str=None,
+                            kind: str="candidate_list") -> str:
+        return self._enqueue(kind, to_address, {
+            "to":         to_address,
+            "candidates": candidate_profiles,
+            "session_id": session_id
+        }, session_id, turn_id)
+
+    def _enqueue(self, kind: str, to_address: str, message: dict,
+                 session_id: str, turn_id: str) -> str:
+        """Queues the message and returns the path it will be written to."""
+        msg_id, path = email_store.allocate(to_address, kind)
+        queued = outbox.put(session_id, kind, {
+            "message_id": msg_id, "path": path, "message": message,
+            "session_id": session_id, "turn_id": turn_id,
+        })
+        log_event("email_queued" if queued else "email_duplicate",
+                  session_id=session_id, turn_id=turn_id, template=kind, to=to_address)
+        if not queued:
+            path = outbox.get(session_id, kind)["path"]     # where the first send went
         return path
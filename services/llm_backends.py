@@ -0,0 +1,154 @@
+# services/llm_backends.py
+
+import asyncio
+import json
+import os
+import threading
+import weakref
+from abc import ABC, abstractmethod
+
+from services.llm_cache import cache_key
+from services.tokens import count_message_tokens, count_tokens
+
+class LLMBackend(ABC):
+    """
+    Where chat completions come from. complete() returns the reply text;
+    stream() is an async generator of content deltas. Both fill the
+    optional `usage` dict with prompt_tokens / completion_tokens.
+    """
+
+    @abstractmethod
+    async def complete(self, model: str, messages: list, usage: dict = None, **params) -> str:
+        pass
+
+    @abstractmethod
+    async def stream(self, model: str, messages: list, usage: dict = None, **params):
+        yield ""
+
+    def is_transient(self, exc: Exception) -> bool:
+        """Whether a failed call is worth retrying."""
+        return isinstance(exc, (ConnectionError, TimeoutError))
+
+class OpenAIBackend(LLMBackend):
+    """
+    Any chat-completions endpoint reachable by the OpenAI SDK. The SDK's
+    own retries are off; llm_service retries with its own deadlines.
+    """
+
+    def __init__(self, base_url: str = None, api_key: str = None):
+        self.base_url = base_url
+        self.api_key  = api_key
+        # One client per event loop: an async client's connection pool
+        # can't be shared between loops
+        self._clients = weakref.WeakKeyDictionary()
+
+    @property
+    def client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            from openai import AsyncOpenAI
+            client = self._clients[loop] = AsyncOpenAI(
+                base_url=self.base_url, api_key=self.api_key, max_retries=0
+            )
+        return client
+
+    def is_transient(self, exc: Exception) -> bool:
+        import openai
+        if isinstance(exc, (openai.RateLimitError, openai.InternalServerError,
+                            openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code == 429 or exc.status_code >= 500
+        return super().is_transient(exc)
+
+    async def complete(self, model: str, messages: list, usage: dict = None, **params) -> str:
+        resp = await self.client.chat.completions.create(
+            model=model, messages=messages, **params
+        )
+        if usage is not None and resp.usage:
+            usage.update(resp.usage.model_dump(exclude_none=True))
+        return resp.choices[0].message.content or ""
+
+    async def stream(self, model: str, messages: list, usage: dict = None, **params):
+        stream = await self.client.chat.completions.create(
+            model=model, messages=messages, stream=True,
+            stream_options={"include_usage": True}, **params
+        )
+        async for chunk in stream:
+            if usage is not None and getattr(chunk, "usage", None):
+                usage.update(chunk.usage.model_dump(exclude_none=True))
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+class StubBackend(OpenAIBackend):
+    """
+    OpenAI wire format against the local stub server
+    (python -m services.stub_llm_server); no API key or network needed.
+    """
+
+    def __init__(self, base_url: str = "http://127.0.0.1:8765/v1"):
+        super().__init__(base_url=base_url, api_key="stub")
+
+class RecordedBackend(LLMBackend):
+    """
+    Replays responses recorded in a JSON-lines file, keyed like the
+    response cache. With `record_from` set, misses are forwarded to that
+    backend and appended to the file, so a live session can be captured
+    once and replayed offline.
+    """
+
+    def __init__(self, path: str, record_from: LLMBackend = None):
+        self.path        = path
+        self.record_from = record_from
+        self._responses  = {}
+        self._lock       = threading.Lock()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        row = json.loads(line)
+                        self._responses[row["key"]] = row["response"]
+
+    async def complete(self, model: str, messages: list, usage: dict = None, **params) -> str:
+        key = cache_key(model, messages)
+        if key in self._responses:
+            text = self._responses[key]
+            if usage is not None:
+                # Recordings carry no usage; estimate it
+                usage.update(prompt_tokens=count_message_tokens(messages),
+                             completion_tokens=count_tokens(text))
+            return text
+        if self.record_from is None:
+            raise LookupError(f"No recorded response for request {key[:12]} in {self.path}")
+
+        text = await self.record_from.complete(model, messages, usage, **params)
+        self._record(key, model, messages, text)
+        return text
+
+    async def stream(self, model: str, messages: list, usage: dict = None, **params):
+        text = await self.complete(model, messages, usage, **params)
+        # Replay word by word so streaming consumers see several chunks
+        for i, word in enumerate(text.split(" ")):
+            yield word if i == 0 else " " + word
+
+    def _record(self, key: str, model: str, messages: list, text: str):
+        with self._lock:
+            self._responses[key] = text
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({
+                    "key": key, "model": model, "messages": messages, "response": text
+                }, ensure_ascii=False) + "\n")
+
+def make_backend(name: str, stub_url: str = None, recording_path: str = None) -> LLMBackend:
+    """Builds the backend named by LLM_BACKEND: openai | stub | recorded | record."""
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "stub":
+        return StubBackend(stub_url)
+    if name == "recorded":
+        return RecordedBackend(recording_path)
+    if name == "record":
+        return RecordedBackend(recording_path, record_from=OpenAIBackend())
+    raise ValueError(f"Unknown LLM backend: {name}")
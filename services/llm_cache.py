@@ -0,0 +1,102 @@
+# services/llm_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def cache_key(model: str, messages: list, params: dict = None) -> str:
+    """
+    Hash of the normalised (model, messages, params) tuple. Whitespace runs
+    are collapsed so trivially different prompts share an entry.
+    """
+    norm = [[m["role"], " ".join(m["content"].split())] for m in messages]
+    blob = json.dumps([model, norm, params or {}], ensure_ascii=False,
+                      separators=(",", ":"), sort_keys=True)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Exact-match LLM response cache: an in-memory LRU in front of an
+    on-disk SQLite table. Entries older than `ttl` seconds are ignored
+    and purged. get() and put() may touch the disk, so async callers run
+    them off the event loop (asyncio.to_thread).
+    """
+
+    def __init__(self, path: str, max_entries: int = 1000, ttl: float = 7 * 24 * 3600):
+        self.path        = path
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.hits        = 0
+        self.disk_hits   = 0
+        self.misses      = 0
+        self._lru        = OrderedDict()      # key -> (stored_at, text)
+        self._lock       = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, stored_at REAL NOT NULL, response TEXT NOT NULL)"
+        )
+        self._db.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - ttl,))
+        self._db.commit()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry and now - entry[0] < self.ttl:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self._lru.pop(key, None)
+
+            row = self._db.execute(
+                "SELECT stored_at, response FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[0] < self.ttl:
+                self._remember(key, row[0], row[1])
+                self.hits      += 1
+                self.disk_hits += 1
+                return row[1]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, text)
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, stored_at, response) VALUES (?, ?, ?)",
+                (key, now, text)
+            )
+            self._db.commit()
+
+    def _remember(self, key: str, stored_at: float, text: str):
+        self._lru[key] = (stored_at, text)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits":      self.hits,
+            "disk_hits": self.disk_hits,
+            "misses":    self.misses,
+            "hit_rate":  self.hits / lookups if lookups else 0.0,
+            "in_memory": len(self._lru),
+        }
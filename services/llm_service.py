@@ -1,17 +1,67 @@
 # services/llm_service.py
 
-from openai import OpenAI
-from config import MESSAGE_BUFFER_SIZE
+import asyncio
+import time
 
-client = OpenAI()
+from config import (
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_SIZE, LLM_CACHE_TTL,
+    LLM_BACKEND, LLM_MODEL, LLM_STUB_URL, LLM_RECORDING_PATH,
+    LLM_PROMPT_TOKEN_BUDGET, LLM_ROUTES,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_CAP, LLM_HEDGE_DEFAULT_DELAY,
+)
+from core.event_loop import run_sync, iter_sync
+from core.logger import log_event
+from core import metrics, timing
+from services.llm_backends import LLMBackend, make_backend
+from services.llm_cache import ResponseCache, cache_key
+from services.prompt_builder import PROMPT_VERSION
+from services.resilience import LLMUnavailableError, call_with_retries
+from services import resilience
+from services.tokens import (
+    UsageTotals, count_tokens, fit_to_budget, total_usage, usage_by_agent,
+)
 
-def call_llm(system_prompt: str, history: list, user_text: str) -> str:
+MODEL = LLM_MODEL
+
+LLM_TOKENS = metrics.counter(
+    "smilebot_llm_tokens_total", "LLM tokens by purpose and type (prompt|cached_prompt|completion)",
+    ["purpose", "type"],
+)
+CACHE_LOOKUPS = metrics.counter(
+    "smilebot_cache_lookups_total", "Response cache lookups by cache (exact|semantic) and result",
+    ["cache", "result"],
+)
+
+backend = make_backend(LLM_BACKEND, LLM_STUB_URL, LLM_RECORDING_PATH)
+cache   = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_SIZE, LLM_CACHE_TTL) if LLM_CACHE_ENABLED else None
+
+def set_backend(new_backend: LLMBackend):
+    """Swap the backend at runtime (benchmarks, load tests)."""
+    global backend
+    backend = new_backend
+
+# Route keys that configure the call rather than the request body
+_POLICY_KEYS = ("model", "timeout", "hedge")
+
+def route(purpose: str):
     """
-    Wraps the v1 chat API. 
-    - system_prompt: the system-role message (string)
-    - history: list of {"role","content"} dicts
-    - user_text: the final user or classification prompt
+    (model, params, timeout, hedge) for a call purpose; unknown purposes
+    use long_generation's route.
     """
+    r = LLM_ROUTES.get(purpose) or LLM_ROUTES["long_generation"]
+    params = {k: v for k, v in r.items() if k not in _POLICY_KEYS and v is not None}
+    return r.get("model") or MODEL, params, r.get("timeout") or 60, bool(r.get("hedge"))
+
+def _with_retries(make_call, purpose: str, timeout: float, hedge: bool = False):
+    return call_with_retries(
+        make_call, purpose, timeout, LLM_MAX_RETRIES, backend.is_transient,
+        LLM_BACKOFF_BASE, LLM_BACKOFF_CAP, hedge, LLM_HEDGE_DEFAULT_DELAY
+    )
+
+def _build_messages(system_prompt, history: list, user_text: str) -> list:
+    # build_prompt() returns a ready system message; plain strings still work
+    if isinstance(system_prompt, dict):
+        system_prompt = system_prompt["content"]
     messages = [{"role": "system", "content": str(system_prompt)}]
     for m in history:
         messages.append({
@@ -19,9 +69,163 @@ def call_llm(system_prompt: str, history: list, user_text: str) -> str:
             "content": str(m.get("content",""))
         })
     messages.append({"role": "user", "content": str(user_text)})
+    return messages
+
+def _record_usage(usage: dict, prompt_estimate: int, reply: str, trimmed: int,
+                  purpose: str, model: str, agent: str, session_usage: UsageTotals,
+                  session_id: str, turn_id: str):
+    # Prefer the provider's numbers; fall back to our own estimate
+    prompt_tokens     = usage.get("prompt_tokens", prompt_estimate)
+    completion_tokens = usage.get("completion_tokens", count_tokens(reply))
+    cached_tokens     = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+    for totals in (total_usage, usage_by_agent[agent or "unknown"], session_usage):
+        if totals is not None:
+            totals.add(prompt_tokens, completion_tokens, trimmed, cached_tokens)
+    LLM_TOKENS.labels(purpose=purpose, type="prompt").inc(prompt_tokens)
+    LLM_TOKENS.labels(purpose=purpose, type="cached_prompt").inc(cached_tokens)
+    LLM_TOKENS.labels(purpose=purpose, type="completion").inc(completion_tokens)
+    log_event(
+        "llm_call", session_id=session_id, turn_id=turn_id, agent=agent,
+        purpose=purpose, model=model, prompt_tokens=prompt_tokens,
+        cached_tokens=cached_tokens, completion_tokens=completion_tokens,
+        trimmed_messages=trimmed, prompt_version=PROMPT_VERSION
+    )
+
+async def acall_llm(system_prompt: str, history: list, user_text: str,
+                    purpose: str="long_generation",
+                    use_cache: bool=True, token_budget: int=None, hedge: bool=None,
+                    agent: str=None, session_usage: UsageTotals=None,
+                    session_id: str=None, turn_id: str=None) -> str:
+    """
+    One chat completion through the configured backend.
+    - system_prompt: the system-role message (string)
+    - history: list of {"role","content"} dicts; oldest dropped to fit the budget
+    - user_text: the final user or classification prompt
+    - purpose: classify | short_answer | long_generation | summary;
+      picks model, max_tokens and temperature from LLM_ROUTES
+    - use_cache: False to bypass the response cache for this call site
+    - token_budget: max prompt tokens (default LLM_PROMPT_TOKEN_BUDGET)
+    - hedge: fire a backup request after the purpose's p95 latency
+      (default from the route)
+    - agent / session_usage: where to account the call's token usage
+    - session_id / turn_id: correlation ids stamped on the call's log line
+    Raises LLMUnavailableError once the route's deadline and retries are spent.
+    """
+    messages, prompt_tokens, trimmed = fit_to_budget(
+        _build_messages(system_prompt, history, user_text),
+        token_budget or LLM_PROMPT_TOKEN_BUDGET
+    )
+    model, params, timeout, route_hedge = route(purpose)
+    key = cache_key(model, messages, params) if cache and use_cache else None
+    if key:
+        hit = await asyncio.to_thread(cache.get, key)
+        CACHE_LOOKUPS.labels(cache="exact", result="miss" if hit is None else "hit").inc()
+        if hit is not None:
+            log_event("llm_cache_hit", session_id=session_id, turn_id=turn_id,
+                      agent=agent, purpose=purpose)
+            return hit
+
+    usage = {}
+    with timing.timed(agent, f"llm:{purpose}"):
+        text = (await _with_retries(
+            lambda: backend.complete(model, messages, usage, **params),
+            purpose, timeout, route_hedge if hedge is None else hedge
+        )).strip()
+    _record_usage(usage, prompt_tokens, text, trimmed, purpose, model, agent, session_usage,
+                  session_id, turn_id)
+    if key:
+        await asyncio.to_thread(cache.put, key, text)
+    return text
 
-    resp = client.chat.completions.create(
-        model="gpt-4",
-        messages=messages
+async def astream_llm(system_prompt: str, history: list, user_text: str,
+                      purpose: str="long_generation",
+                      use_cache: bool=True, token_budget: int=None,
+                      agent: str=None, session_usage: UsageTotals=None,
+                      session_id: str=None, turn_id: str=None):
+    """
+    Streaming variant of acall_llm: yields content deltas as they arrive.
+    Leading whitespace is dropped so the joined text matches acall_llm's.
+    A cache hit comes through as a single chunk; a completed stream is cached.
+    Retries only happen before the first token; the route's timeout is the
+    deadline for the first token and for each gap between tokens.
+    """
+    messages, prompt_tokens, trimmed = fit_to_budget(
+        _build_messages(system_prompt, history, user_text),
+        token_budget or LLM_PROMPT_TOKEN_BUDGET
     )
-    return resp.choices[0].message.content.strip()
+    model, params, timeout, _ = route(purpose)
+    key = cache_key(model, messages, params) if cache and use_cache else None
+    if key:
+        hit = await asyncio.to_thread(cache.get, key)
+        CACHE_LOOKUPS.labels(cache="exact", result="miss" if hit is None else "hit").inc()
+        if hit is not None:
+            log_event("llm_cache_hit", session_id=session_id, turn_id=turn_id,
+                      agent=agent, purpose=purpose)
+            yield hit
+            return
+
+    usage = {}
+
+    async def open_stream():
+        # First non-blank delta, so a retry covers everything up to it
+        deltas = backend.stream(model, messages, usage, **params)
+        try:
+            async for delta in deltas:
+                delta = delta.lstrip()
+                if delta:
+                    return deltas, delta
+            return deltas, None
+        except BaseException:
+            await deltas.aclose()
+            raise
+
+    started = time.perf_counter()
+    deltas, first = await _with_retries(open_stream, purpose, timeout)
+    timing.record(agent, f"llm_ttft:{purpose}", time.perf_counter() - started)
+    parts = []
+    try:
+        if first is not None:
+            parts.append(first)
+            yield first
+            while True:
+                try:
+                    delta = await asyncio.wait_for(deltas.__anext__(), timeout)
+                except StopAsyncIteration:
+                    break
+                except asyncio.TimeoutError:
+                    resilience.stats.incr(purpose, "timeouts")
+                    raise LLMUnavailableError(f"LLM stream ({purpose}) stalled for {timeout}s")
+                parts.append(delta)
+                yield delta
+    finally:
+        await deltas.aclose()
+    timing.record(agent, f"llm:{purpose}", time.perf_counter() - started)
+
+    text = "".join(parts).strip()
+    _record_usage(usage, prompt_tokens, text, trimmed, purpose, model, agent, session_usage,
+                  session_id, turn_id)
+    if key:
+        await asyncio.to_thread(cache.put, key, text)
+
+def call_llm(system_prompt: str, history: list, user_text: str, **kwargs) -> str:
+    """Sync wrapper around acall_llm."""
+    return run_sync(acall_llm(system_prompt, history, user_text, **kwargs))
+
+def stream_llm(system_prompt: str, history: list, user_text: str, **kwargs):
+    """Sync wrapper around astream_llm."""
+    return iter_sync(astream_llm(system_prompt, history, user_text, **kwargs))
+
+def cache_stats() -> dict:
+    """Hit/miss counters for the response cache (empty if disabled)."""
+    return cache.stats() if cache else {}
+
+def resilience_stats() -> dict:
+    """Retries, hedges, hedge wins, timeouts and failures per purpose."""
+    return resilience.stats.as_dict()
+
+def usage_stats() -> dict:
+    """Token usage for the whole process and per agent."""
+    return {
+        "total":    total_usage.as_dict(),
+        "by_agent": {name: t.as_dict() for name, t in usage_by_agent.items()},
+    }
@@ -0,0 +1,263 @@
+# services/log_index.py
+#
+# Inverted index over the JSON-lines logs (core/logger.py) and the session
+# store's transcripts, kept in SQLite and updated incrementally.
+#   python -m services.log_index update
+#   python -m services.log_index query "agent:CandidateBot dbs latency>5" --sessions
+
+import argparse
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import Counter
+
+from config import LOG_PATH, LOG_INDEX_PATH, SESSION_STORE_PATH
+from services.semantic_cache import STOPWORDS
+
+_WORD   = re.compile(r"[a-z0-9]+")
+_FILTER = re.compile(r"^(agent|session|turn|kind):(.+)$|^latency([<>]=?)([0-9.]+)$")
+
+# Fields that identify a record rather than describe it
+_ID_FIELDS = {"ts", "kind", "session_id", "turn_id", "agent"}
+
+SNIPPET_CHARS = 160
+BATCH_DOCS    = 2000
+
+def terms(text: str) -> set:
+    words = set(_WORD.findall(text.lower()))
+    return words - STOPWORDS or words
+
+class LogIndex:
+    """
+    One row per log record or transcript message in `docs`, and a
+    (term, doc_id) posting for every distinct word in it. Queries start
+    from whichever is rarer, the least frequent term's postings or the
+    latency range, and probe the rest through primary-key lookups, so
+    cost follows the smallest candidate set rather than the corpus.
+
+    Log files are read from a per-inode byte offset, so rotation never
+    re-reads or skips lines; transcripts from the last session-store event
+    id indexed (ids are committed in order, unlike timestamps).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                doc_id INTEGER PRIMARY KEY, source TEXT NOT NULL, kind TEXT,
+                session_id TEXT, turn_id TEXT, agent TEXT, ts REAL,
+                latency REAL, snippet TEXT);
+            CREATE INDEX IF NOT EXISTS docs_latency ON docs (latency);
+            CREATE INDEX IF NOT EXISTS docs_agent_latency ON docs (agent, latency);
+            CREATE INDEX IF NOT EXISTS docs_session ON docs (session_id);
+            CREATE TABLE IF NOT EXISTS postings (
+                term TEXT NOT NULL, doc_id INTEGER NOT NULL,
+                PRIMARY KEY (term, doc_id)) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, mark REAL NOT NULL);
+        """)
+        self._db.commit()
+
+    # ---- indexing ----
+    def update(self, log_path: str = LOG_PATH, store_path: str = SESSION_STORE_PATH) -> int:
+        """Indexes everything appended since the last update; returns the doc count."""
+        added = 0
+        # Rotated files first (oldest name first), then the live file
+        for path in sorted(glob.glob(log_path + ".*")) + [log_path]:
+            if os.path.exists(path):
+                added += self._index_log_file(path)
+        if os.path.exists(store_path):
+            added += self._index_transcripts(store_path)
+        return added
+
+    def _index_log_file(self, path: str) -> int:
+        st     = os.stat(path)
+        source = f"inode:{st.st_ino}"
+        offset = int(self._mark(source))
+        if st.st_size < offset:
+            offset = 0                      # truncated in place (or a reused inode)
+        added  = 0
+        with open(path, "rb") as f:
+            f.seek(offset)
+            batch = []
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break                           # still being written
+                offset += len(line)
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                batch.append(self._log_doc(rec))
+                if len(batch) >= BATCH_DOCS:
+                    added += self._add_docs(batch, source, offset)
+                    batch = []
+            added += self._add_docs(batch, source, offset)
+        return added
+
+    def _index_transcripts(self, store_path: str) -> int:
+        source = f"store:{os.path.abspath(store_path)}"
+        mark   = self._mark(source)
+        store  = sqlite3.connect(f"file:{store_path}?mode=ro", uri=True)
+        try:
+            rows = store.execute(
+                "SELECT id, session_id, at, kind, payload FROM events"
+                " WHERE id > ? AND kind IN ('user', 'assistant') ORDER BY id",
+                (mark,)
+            ).fetchall()
+        finally:
+            store.close()
+        added, batch = 0, []
+        for event_id, session_id, at, kind, payload in rows:
+            text = json.loads(payload)["text"]
+            batch.append((("transcript", kind, session_id, None, None, at, None,
+                           text[:SNIPPET_CHARS]), terms(text)))
+            if len(batch) >= BATCH_DOCS:
+                added += self._add_docs(batch, source, event_id)
+                batch = []
+        added += self._add_docs(batch, source, rows[-1][0] if rows else mark)
+        return added
+
+    @staticmethod
+    def _log_doc(rec: dict):
+        text = " ".join(str(v) for k, v in rec.items()
+                        if k not in _ID_FIELDS and isinstance(v, str))
+        snippet = rec.get("response") or rec.get("msg") or text
+        row = ("log", rec.get("kind"), rec.get("session_id"), rec.get("turn_id"),
+               rec.get("agent"), rec.get("ts"), rec.get("response_time"),
+               snippet[:SNIPPET_CHARS])
+        return row, terms(text)
+
+    def _add_docs(self, batch: list, source: str, mark: float) -> int:
+        with self._db:
+            df = Counter()
+            for row, words in batch:
+                doc_id = self._db.execute(
+                    "INSERT INTO docs (source, kind, session_id, turn_id, agent, ts, latency, snippet)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+                ).lastrowid
+                self._db.executemany(
+                    "INSERT INTO postings (term, doc_id) VALUES (?, ?)",
+                    ((w, doc_id) for w in words)
+                )
+                df.update(words)
+            self._db.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?)"
+                " ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                df.items()
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO sources (source, mark) VALUES (?, ?)", (source, mark)
+            )
+        return len(batch)
+
+    def _mark(self, source: str) -> float:
+        row = self._db.execute("SELECT mark FROM sources WHERE source = ?", (source,)).fetchone()
+        return row[0] if row else 0
+
+    # ---- querying ----
+    def search(self, query: str, limit: int = 50) -> list:
+        """
+        Words are ANDed; filters are agent:<name>, session:<id>, turn:<id>,
+        kind:<turn|llm_call|email|user|assistant|...> and latency>N / latency<N
+        (seconds). Returns matching docs, newest first.
+        """
+        words, where, args = [], [], []
+        for tok in query.split():
+            m = _FILTER.match(tok)
+            if not m:
+                words.extend(_WORD.findall(tok.lower()))
+            elif m.group(1):
+                col = {"agent": "agent", "session": "session_id",
+                       "turn": "turn_id", "kind": "kind"}[m.group(1)]
+                where.append(f"d.{col} = ?")
+                args.append(m.group(2))
+            else:
+                where.append(f"d.latency {m.group(3)} ?")
+                args.append(float(m.group(4)))
+        words = [w for w in dict.fromkeys(words) if w not in STOPWORDS] or words
+
+        # Rarest term first; a missing term means no match at all
+        dfs = {}
+        for w in words:
+            row = self._db.execute("SELECT df FROM terms WHERE term = ?", (w,)).fetchone()
+            if not row:
+                return []
+            dfs[w] = row[0]
+        words.sort(key=dfs.get)
+
+        probes = [f"EXISTS (SELECT 1 FROM postings p{i} WHERE p{i}.term = ? AND p{i}.doc_id = d.doc_id)"
+                  for i in range(len(words))]
+        cols = "d.doc_id, d.source, d.kind, d.session_id, d.turn_id, d.agent, d.ts, d.latency, d.snippet"
+
+        if words and not self._filters_rarer(where, args, dfs[words[0]]):
+            # Walk the rarest term's postings, probe the other terms
+            cond = " AND ".join(where + probes[1:]) or "1"
+            sql = (f"SELECT {cols} FROM postings p CROSS JOIN docs d ON d.doc_id = p.doc_id"
+                   f" WHERE p.term = ? AND {cond} ORDER BY p.doc_id DESC LIMIT ?")
+            params = [words[0]] + args + words[1:] + [limit]
+        else:
+            # Walk the filters' index range, probe every term
+            cond = " AND ".join(where + probes) or "1"
+            sql = f"SELECT {cols} FROM docs d WHERE {cond} ORDER BY d.doc_id DESC LIMIT ?"
+            params = args + words + [limit]
+        keys = ("doc_id", "source", "kind", "session_id", "turn_id", "agent", "ts", "latency", "snippet")
+        return [dict(zip(keys, r)) for r in self._db.execute(sql, params)]
+
+    def _filters_rarer(self, where: list, args: list, rarest_df: int) -> bool:
+        """True if the structured filters alone match fewer docs than the rarest term."""
+        if not where:
+            return False
+        count = self._db.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM docs d WHERE {' AND '.join(where)} LIMIT ?)",
+            args + [rarest_df]
+        ).fetchone()[0]
+        return count < rarest_df
+
+    def stats(self) -> dict:
+        return {
+            "docs":  self._db.execute("SELECT COUNT(*) FROM docs").fetchone()[0],
+            "terms": self._db.execute("SELECT COUNT(*) FROM terms").fetchone()[0],
+        }
+
+def main():
+    p = argparse.ArgumentParser(description="Search conversation logs and transcripts")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("update", help="index new log lines and transcript messages")
+    q = sub.add_parser("query", help='e.g. "agent:CandidateBot dbs latency>5"')
+    q.add_argument("query")
+    q.add_argument("--limit", type=int, default=50)
+    q.add_argument("--sessions", action="store_true", help="list matching session ids only")
+    q.add_argument("--no-update", action="store_true", help="skip indexing new lines first")
+    args = p.parse_args()
+
+    index = LogIndex(LOG_INDEX_PATH)
+    if args.cmd == "update" or not args.no_update:
+        started = time.perf_counter()
+        added = index.update()
+        if args.cmd == "update":
+            print(f"Indexed {added} new records in {time.perf_counter() - started:.2f}s ({index.stats()})")
+            return
+
+    started = time.perf_counter()
+    hits = index.search(args.query, args.limit)
+    elapsed = (time.perf_counter() - started) * 1000
+    if args.sessions:
+        for session_id in dict.fromkeys(h["session_id"] for h in hits if h["session_id"]):
+            print(session_id)
+    else:
+        for h in hits:
+            latency = f"{h['latency']:.2f}s" if h["latency"] is not None else "-"
+            print(f"{h['session_id'] or '-'}  {h['turn_id'] or '-'}  {h['kind']:<9} "
+                  f"{h['agent'] or '-':<12} {latency:>7}  {h['snippet']!r}")
+    print(f"{len(hits)} hits in {elapsed:.1f} ms")
+
+if __name__ == "__main__":
+    main()
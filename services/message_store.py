@@ -0,0 +1,113 @@
+# services/message_store.py
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+from config import EMAIL_STORE_ROOT, SUMMARY_STORE_ROOT
+
+_UNSAFE = re.compile(r"[^a-z0-9._-]+")
+
+def normalise_recipient(address: str) -> str:
+    return " ".join(str(address).split()).lower()
+
+def _slug(recipient: str) -> str:
+    return _UNSAFE.sub("_", recipient).strip("._-")[:40] or "unknown"
+
+def new_message_id() -> str:
+    """Time-ordered and unique: hex milliseconds + random suffix."""
+    return f"{int(time.time() * 1000):011x}{uuid.uuid4().hex[:8]}"
+
+def write_json_atomic(path: str, record: dict):
+    """Temp file in the same directory, fsync, then rename over `path`."""
+    folder = os.path.dirname(path) or "."
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(record, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+class MessageStore:
+    """
+    Stores each message as its own JSON file under
+    `<root>/<aa>/<bb>/<recipient-slug>.<kind>.<message-id>.json`, where
+    aa/bb come from a hash of the recipient, so no directory grows past a
+    few hundred entries and no raw user input reaches a path. Files are
+    written atomically and never overwritten by a later message; the
+    manifest (SQLite, indexed by recipient) finds them without listing
+    directories.
+    """
+
+    def __init__(self, root: str):
+        self.root  = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(root, "manifest.sqlite3"), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " message_id TEXT PRIMARY KEY, recipient TEXT NOT NULL, kind TEXT NOT NULL,"
+            " path TEXT NOT NULL, session_id TEXT, created_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS messages_recipient ON messages (recipient, created_at)"
+        )
+        self._db.commit()
+
+    def allocate(self, recipient: str, kind: str):
+        """Picks (message_id, path) for a message before it is written."""
+        recipient = normalise_recipient(recipient)
+        digest    = hashlib.sha256(recipient.encode("utf-8")).hexdigest()
+        msg_id    = new_message_id()
+        name      = f"{_slug(recipient)}.{_UNSAFE.sub('_', kind)}.{msg_id}.json"
+        return msg_id, os.path.join(self.root, digest[:2], digest[2:4], name)
+
+    def write(self, msg_id: str, path: str, recipient: str, kind: str,
+              record: dict, session_id: str = None):
+        """Writes an allocated message and indexes it; repeating it is harmless."""
+        write_json_atomic(path, record)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO messages"
+                " (message_id, recipient, kind, path, session_id, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (msg_id, normalise_recipient(recipient), kind, path, session_id, time.time())
+            )
+            self._db.commit()
+
+    def save(self, recipient: str, kind: str, record: dict, session_id: str = None):
+        msg_id, path = self.allocate(recipient, kind)
+        self.write(msg_id, path, recipient, kind, record, session_id)
+        return msg_id, path
+
+    def for_recipient(self, recipient: str, kind: str = None) -> list:
+        """Messages to `recipient`, oldest first, as dicts."""
+        sql  = ("SELECT message_id, kind, path, session_id, created_at FROM messages"
+                " WHERE recipient = ?")
+        args = [normalise_recipient(recipient)]
+        if kind:
+            sql += " AND kind = ?"
+            args.append(kind)
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY created_at", args).fetchall()
+        keys = ("message_id", "kind", "path", "session_id", "created_at")
+        return [dict(zip(keys, r)) for r in rows]
+
+email_store   = MessageStore(EMAIL_STORE_ROOT)
+summary_store = MessageStore(SUMMARY_STORE_ROOT)
@@ -0,0 +1,198 @@
+# services/outbox.py
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from core import metrics
+from services.resilience import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_EVENTS = metrics.counter(
+    "smilebot_outbox_events_total", "Outbox messages by event (queued, duplicate, sent, retry, failed)",
+    ["outbox", "event"],
+)
+OUTBOX_PENDING = metrics.gauge(
+    "smilebot_outbox_pending", "Outbox messages waiting for delivery", ["outbox"]
+)
+
+class PermanentDeliveryError(Exception):
+    """Raised (or returned) by a deliverer when retrying cannot help, e.g. a rejected address."""
+
+class Outbox:
+    """
+    Durable queue in front of a slow side effect (writing or sending an
+    email). put() commits one row and returns; a worker thread delivers
+    pending rows in batches and marks them sent in one transaction.
+
+    Rows are keyed by (session_id, kind), so a repeated send for the same
+    session is a no-op. Rows still pending at shutdown are delivered by
+    the next process; failures retry with backoff up to `max_attempts`,
+    except PermanentDeliveryError, which fails the row at once.
+    """
+
+    def __init__(self, name: str, path: str, deliver, batch_size: int = 50,
+                 linger: float = 0.05, max_attempts: int = 5):
+        self.name         = name
+        self.deliver      = deliver         # callable([(kind, payload)]) -> [None | Exception]
+        self.batch_size   = batch_size
+        self.linger       = linger
+        self.max_attempts = max_attempts
+        self._lock        = threading.Lock()
+        self._wake        = threading.Event()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")   # survives a process crash
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " msg_key TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+            " queued_at REAL NOT NULL, next_at REAL NOT NULL, sent_at REAL, error TEXT)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS outbox_pending ON outbox (status, next_at)"
+        )
+        self._db.commit()
+        OUTBOX_PENDING.labels(outbox=name).set_function(self.pending)
+
+        self._thread = threading.Thread(target=self._run, name=f"outbox-{name}", daemon=True)
+        self._thread.start()
+        self._wake.set()                    # pick up anything left from the last run
+
+    def put(self, session_id: str, kind: str, payload: dict) -> bool:
+        """Queues a message; False if this session already queued one of this kind."""
+        key = f"{session_id}:{kind}" if session_id else f"{uuid.uuid4().hex}:{kind}"
+        now = time.time()
+        with self._lock:
+            cur = self._db.execute(
+                "INSERT OR IGNORE INTO outbox (msg_key, kind, payload, queued_at, next_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, kind, json.dumps(payload, ensure_ascii=False), now, now)
+            )
+            self._db.commit()
+        queued = cur.rowcount == 1
+        OUTBOX_EVENTS.labels(outbox=self.name, event="queued" if queued else "duplicate").inc()
+        if queued:
+            self._wake.set()
+        return queued
+
+    def get(self, session_id: str, kind: str):
+        """The payload queued for (session_id, kind), or None."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT payload FROM outbox WHERE msg_key = ?", (f"{session_id}:{kind}",)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pending(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = 'pending'"
+            ).fetchone()[0]
+
+    def dead_letters(self, limit: int = 100) -> list:
+        """Rows that gave up (rejected or out of attempts), newest first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT msg_key, kind, payload, attempts, error, queued_at FROM outbox"
+                " WHERE status = 'failed' ORDER BY queued_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        keys = ("msg_key", "kind", "payload", "attempts", "error", "queued_at")
+        return [dict(zip(keys, r), payload=json.loads(r[2])) for r in rows]
+
+    def requeue_failed(self) -> int:
+        """Gives every dead letter a fresh set of attempts."""
+        with self._lock, self._db:
+            n = self._db.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_at = ?"
+                " WHERE status = 'failed'", (time.time(),)
+            ).rowcount
+        if n:
+            self._wake.set()
+        return n
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Waits until nothing is due for delivery; True if the outbox drained."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                due = self._db.execute(
+                    "SELECT COUNT(*) FROM outbox WHERE status = 'pending' AND next_at <= ?",
+                    (time.time(),)
+                ).fetchone()[0]
+            if not due:
+                return True
+            self._wake.set()
+            time.sleep(0.01)
+        return False
+
+    def _run(self):
+        errors = 0
+        while True:
+            self._wake.wait(timeout=1.0)    # also wakes for scheduled retries
+            self._wake.clear()
+            time.sleep(self.linger)         # let a burst of sends share a batch
+            try:
+                while self._deliver_batch():
+                    pass
+                errors = 0
+            except Exception:
+                # e.g. "database is locked": the rows are still pending, so
+                # back off and try again rather than let the worker die
+                errors += 1
+                logger.exception("outbox %s worker error (%d in a row)", self.name, errors)
+                time.sleep(backoff_delay(errors - 1, 0.5, 30.0))
+                self._wake.set()
+
+    def _deliver_batch(self) -> bool:
+        now = time.time()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT msg_key, kind, payload, attempts FROM outbox"
+                " WHERE status = 'pending' AND next_at <= ? ORDER BY queued_at LIMIT ?",
+                (now, self.batch_size)
+            ).fetchall()
+        if not rows:
+            return False
+
+        try:
+            results = self.deliver([(kind, json.loads(payload)) for _, kind, payload, _ in rows])
+        except Exception as e:
+            results = [e] * len(rows)
+
+        sent, retry, failed = [], [], []
+        for (key, _, _, attempts), e in zip(rows, results):
+            if e is None:
+                sent.append((time.time(), key))
+            else:
+                attempts += 1
+                if isinstance(e, PermanentDeliveryError) or attempts >= self.max_attempts:
+                    logger.error("outbox %s gave up on %s after %d attempts: %s",
+                                 self.name, key, attempts, e)
+                    failed.append((attempts, str(e), key))
+                else:
+                    next_at = time.time() + backoff_delay(attempts, 1.0, 60.0)
+                    retry.append((attempts, next_at, str(e), key))
+
+        # One transaction acknowledges the whole batch
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE outbox SET status = 'sent', sent_at = ?, error = NULL WHERE msg_key = ?", sent
+            )
+            self._db.executemany(
+                "UPDATE outbox SET attempts = ?, next_at = ?, error = ? WHERE msg_key = ?", retry
+            )
+            self._db.executemany(
+                "UPDATE outbox SET status = 'failed', attempts = ?, error = ? WHERE msg_key = ?", failed
+            )
+        for event, items in (("sent", sent), ("retry", retry), ("failed", failed)):
+            if items:
+                OUTBOX_EVENTS.labels(outbox=self.name, event=event).inc(len(items))
+        return len(rows) == self.batch_size and bool(sent)
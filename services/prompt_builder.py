@@ -1,36 +1,74 @@
-def build_prompt(user_type: str, context: dict) -> dict:
-    if user_type == "candidate":
-        return {
-            "role": "system",
-            "content": (
-                "You are CandidateBot for Smile Education.\n"
-                f"Candidate lives in {context.get('postcode','Unknown')} and seeks "
-                f"a {context.get('job_type','role')} role.\n"
-                "Help them register, collect documents, explain DBS, and close warmly."
-            )
-        }
+# services/prompt_builder.py
+#
+# System prompts are laid out prefix-first: each bot's static instructions
+# (identical for every session and turn) come first, then the per-session
+# context, then the conversation history. Providers that cache prompt
+# prefixes (OpenAI does so automatically past 1024 tokens) can then reuse
+# the instructions, and most of the history, from one turn to the next.
+# Bump PROMPT_VERSION whenever a static prefix changes. It heads every
+# prefix, so cached-token drops in the llm_call logs can be traced to the
+# edit and stale entries in the LLM response cache stop matching.
 
-    if user_type == "school":
-        # Build a full context block
-        ctx_lines = "\n".join(f"{k}: {v}" for k, v in context.items())
-        return {
-            "role": "system",
-            "content": (
-                "You are SchoolBot for Smile Education.\n"
-                f"Current school context:\n{ctx_lines}\n\n"
-                "Gather requirements, suggest candidates, and automate self-serve selection."
-            )
-        }
+PROMPT_VERSION = "2"
 
-    # GeneralBot as before
-    return {
-        "role": "system",
-        "content": (
-            "You are GeneralBot for Smile Education.\n"
-            "First, greet the user and ask:\n"
-            "  1. Find a teaching job\n"
-            "  2. Recruit staff for a school\n"
-            "Or answer any other questions about our services.\n"
-            "Use a friendly, helpful tone with no markdown formatting."
-        )
-    }
+STATIC_PREFIXES = {
+    "candidate": (
+        "You are CandidateBot for Smile Education.\n"
+        "Help candidates register, collect documents, explain DBS, and close warmly."
+    ),
+    "school": (
+        "You are SchoolBot for Smile Education.\n"
+        "Gather requirements, suggest candidates, and automate self-serve selection."
+    ),
+    "other": (
+        "You are GeneralBot for Smile Education.\n"
+        "First, greet the user and ask:\n"
+        "  1. Find a teaching job\n"
+        "  2. Recruit staff for a school\n"
+        "Or answer any other questions about our services.\n"
+        "Use a friendly, helpful tone with no markdown formatting."
+    ),
+}
+
+CONTEXT_HEADINGS = {
+    "candidate": "Candidate details so far:",
+    "school":    "Current school context:",
+}
+
+def prompt_prefix(user_type: str) -> str:
+    """The static instructions every prompt for `user_type` starts with."""
+    return f"[prompt v{PROMPT_VERSION}]\n" + STATIC_PREFIXES.get(user_type, STATIC_PREFIXES["other"])
+
+def build_prompt(user_type: str, context) -> dict:
+    """
+    System message for `user_type`. Given a ConversationContext, the result
+    is cached on it until the next update (its `version` changes), so
+    unchanged turns reuse the same message.
+    """
+    version = getattr(context, "version", None)
+    if version is None:                     # a plain dict: nothing to key on
+        return _build(user_type, context)
+    cached = context.prompt_cache.get(user_type)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    prompt = _build(user_type, context)
+    context.prompt_cache[user_type] = (version, prompt)
+    return prompt
+
+def _context_lines(context) -> str:
+    """Known facts only: no empty fields, stage flags or the user type."""
+    skip = getattr(context, "FLAGS", frozenset())
+    return "\n".join(
+        f"{k}: {v}" for k, v in context.items()
+        if v is not None and k not in skip and k != "user_type"
+    )
+
+def _build(user_type: str, context) -> dict:
+    content = prompt_prefix(user_type)
+    heading = CONTEXT_HEADINGS.get(user_type)
+    if heading:
+        # Dynamic part last, after everything that is the same on every turn
+        lines = _context_lines(context)
+        if lines:
+            content += f"\n\n{heading}\n{lines}"
+    return {"role": "system", "content": content}
@@ -0,0 +1,138 @@
+# services/readiness_classifier.py
+#
+# Local done/not-done classifier for the candidate documents stage.
+# Retrain after editing data/readiness_turns.jsonl:
+#   python -m services.readiness_classifier
+
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter
+
+from config import READINESS_MODEL_PATH, READINESS_MIN_CONFIDENCE
+
+TRAINING_PATH = "data/readiness_turns.jsonl"
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"[a-z']+")
+
+# Negations and deferrals ("don't send it", "not yet", "hold on"): naive
+# Bayes scores words independently and can read these as "send it", so
+# any turn containing one is always left to the LLM
+NEGATION_CUES = {
+    "no", "not", "never", "dont", "cannot", "wait", "hold", "yet", "later",
+    "until", "before", "stop", "instead",
+}
+
+def has_negation(text: str) -> bool:
+    words = _WORD.findall(text.lower().replace("’", "'"))
+    return any(w.endswith("n't") or w.replace("'", "") in NEGATION_CUES for w in words)
+
+def features(text: str) -> list:
+    """Word unigrams + bigrams; bigrams keep "not ready" apart from "ready"."""
+    words = _WORD.findall(text.lower().replace("’", "'"))
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+class ReadinessClassifier:
+    """
+    Multinomial naive Bayes over n-grams, stored as per-class log priors
+    and log likelihoods in a small JSON artifact.
+    """
+
+    def __init__(self, log_prior: dict, log_like: dict, log_unseen: dict):
+        self.log_prior  = log_prior       # class -> log P(class)
+        self.log_like   = log_like        # class -> {term: log P(term|class)}
+        self.log_unseen = log_unseen      # class -> log P(unseen term|class)
+
+    @classmethod
+    def train(cls, examples: list, alpha: float = 1.0):
+        """examples: [(text, done_bool), ...]"""
+        counts = {"done": Counter(), "not_done": Counter()}
+        docs   = Counter()
+        for text, done in examples:
+            label = "done" if done else "not_done"
+            counts[label].update(features(text))
+            docs[label] += 1
+
+        vocab = set(counts["done"]) | set(counts["not_done"])
+        log_prior, log_like, log_unseen = {}, {}, {}
+        for label, c in counts.items():
+            denom = sum(c.values()) + alpha * (len(vocab) + 1)
+            log_prior[label]  = math.log(docs[label] / sum(docs.values()))
+            log_like[label]   = {t: math.log((c[t] + alpha) / denom) for t in vocab}
+            log_unseen[label] = math.log(alpha / denom)
+        return cls(log_prior, log_like, log_unseen)
+
+    def predict(self, text: str):
+        """Returns (done, confidence) where confidence is P(predicted class)."""
+        terms = features(text)
+        scores = {}
+        for label, prior in self.log_prior.items():
+            like, unseen = self.log_like[label], self.log_unseen[label]
+            scores[label] = prior + sum(like.get(t, unseen) for t in terms)
+        # Softmax over the two classes
+        top = max(scores.values())
+        p_done = math.exp(scores["done"] - top) / sum(math.exp(s - top) for s in scores.values())
+        done = p_done >= 0.5
+        return done, (p_done if done else 1.0 - p_done)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "log_prior":  self.log_prior,
+                "log_like":   self.log_like,
+                "log_unseen": self.log_unseen,
+            }, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+        return cls(d["log_prior"], d["log_like"], d["log_unseen"])
+
+def _load_default():
+    if not os.path.exists(READINESS_MODEL_PATH):
+        logger.info("readiness model %s missing; using LLM only", READINESS_MODEL_PATH)
+        return None
+    return ReadinessClassifier.load(READINESS_MODEL_PATH)
+
+classifier = _load_default()
+
+# Running totals for the fallback-rate log line
+_decisions = 0
+_fallbacks = 0
+
+def classify_readiness(text: str):
+    """
+    Local done/not-done decision for a documents-stage turn.
+    Returns True/False, or None when the caller should ask the LLM
+    (low confidence, or a negation/deferral cue in the turn).
+    """
+    global _decisions, _fallbacks
+    if classifier is None:
+        return None
+
+    done, confidence = classifier.predict(text)
+    fallback = confidence < READINESS_MIN_CONFIDENCE or has_negation(text)
+    _decisions += 1
+    _fallbacks += fallback
+    logger.info(
+        "readiness done=%s confidence=%.3f fallback=%s fallback_rate=%.1f%%",
+        done, confidence, fallback, 100.0 * _fallbacks / _decisions
+    )
+    return None if fallback else done
+
+def fallback_rate() -> float:
+    return _fallbacks / _decisions if _decisions else 0.0
+
+if __name__ == "__main__":
+    with open(TRAINING_PATH, encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    model = ReadinessClassifier.train([(r["text"], r["done"]) for r in rows])
+    model.save(READINESS_MODEL_PATH)
+    correct = sum(model.predict(r["text"])[0] == r["done"] for r in rows)
+    print(f"Trained on {len(rows)} turns ({correct}/{len(rows)} correct) -> {READINESS_MODEL_PATH}")
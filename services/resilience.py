@@ -0,0 +1,105 @@
+# services/resilience.py
+
+import asyncio
+import random
+import threading
+import time
+from collections import defaultdict
+
+from core import metrics
+from core.timing import RollingWindow
+
+class LLMUnavailableError(RuntimeError):
+    """Raised once an LLM call has used up its deadline and retries."""
+
+LLM_EVENTS = metrics.counter(
+    "smilebot_llm_events_total",
+    "LLM call events by purpose (retries, hedges, hedge_wins, timeouts, failures)",
+    ["purpose", "event"],
+)
+
+class ResilienceStats:
+    def __init__(self):
+        self.counts = defaultdict(int)       # (purpose, event) -> count
+        self._lock  = threading.Lock()
+
+    def incr(self, purpose: str, event: str):
+        with self._lock:
+            self.counts[(purpose, event)] += 1
+        LLM_EVENTS.labels(purpose=purpose, event=event).inc()
+
+    def as_dict(self) -> dict:
+        out = defaultdict(dict)
+        for (purpose, event), n in sorted(self.counts.items()):
+            out[purpose][event] = n
+        return dict(out)
+
+stats     = ResilienceStats()
+latencies = defaultdict(lambda: RollingWindow(200))     # purpose -> successful call latencies
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+async def _hedged(make_call, purpose: str, delay: float):
+    """
+    Start one call; if it hasn't answered after `delay`, start a second
+    and take whichever succeeds first.
+    """
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            stats.incr(purpose, "hedges")
+            tasks.append(asyncio.ensure_future(make_call()))
+
+        pending, error = set(tasks), None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        stats.incr(purpose, "hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if task.done() and not task.cancelled():
+                task.exception()        # mark the loser's error as retrieved
+            task.cancel()
+
+async def call_with_retries(make_call, purpose: str, timeout: float, retries: int,
+                            is_transient, backoff_base: float, backoff_cap: float,
+                            hedge: bool = False, hedge_default: float = 1.0):
+    """
+    Runs `make_call()` (a coroutine factory) under a per-attempt deadline,
+    retrying transient failures with jittered exponential backoff. With
+    `hedge`, each attempt fires a backup request after the purpose's p95.
+    """
+    for attempt in range(retries + 1):
+        started = time.monotonic()
+        try:
+            if hedge:
+                delay = latencies[purpose].percentile(95, min_samples=20) or hedge_default
+                coro  = _hedged(make_call, purpose, delay)
+            else:
+                coro  = make_call()
+            result = await asyncio.wait_for(coro, timeout)
+            latencies[purpose].add(time.monotonic() - started)
+            return result
+        except asyncio.TimeoutError as exc:
+            stats.incr(purpose, "timeouts")
+            last = exc
+        except Exception as exc:
+            if not is_transient(exc):
+                stats.incr(purpose, "failures")
+                raise
+            last = exc
+
+        if attempt < retries:
+            stats.incr(purpose, "retries")
+            await asyncio.sleep(backoff_delay(attempt, backoff_base, backoff_cap))
+
+    stats.incr(purpose, "failures")
+    raise LLMUnavailableError(f"LLM call ({purpose}) failed after {retries + 1} attempts: {last!r}")
@@ -0,0 +1,152 @@
+# services/semantic_cache.py
+
+import re
+import threading
+import zlib
+
+import numpy as np
+
+from config import SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE
+from core import metrics
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+CACHE_LOOKUPS = metrics.counter(
+    "smilebot_cache_lookups_total", "Response cache lookups by cache (exact|semantic) and result",
+    ["cache", "result"],
+)
+
+# Function words that carry no meaning for FAQ matching
+STOPWORDS = {
+    "a", "an", "the", "i", "me", "my", "you", "your", "we", "our", "it",
+    "do", "does", "did", "is", "are", "am", "be", "to", "of", "for", "in",
+    "on", "and", "or", "can", "could", "would", "should", "will", "please",
+}
+
+# Domain paraphrases folded onto one term before matching
+SYNONYMS = {
+    "required": "need", "require": "need", "requires": "need", "needed": "need",
+    "needs": "need", "necessary": "need", "mandatory": "need", "must": "need",
+    "crb": "dbs", "disclosure": "dbs",
+    "resume": "cv", "docs": "document", "paperwork": "document",
+    "pay": "salary", "wage": "salary", "wages": "salary", "paid": "salary",
+    "ta": "assistant",
+}
+
+# Meaningful but shared by most questions ("do I need...", "how do I get..."):
+# counted at a fraction of a content word so the topic decides the match
+GENERIC = {
+    "need", "check", "get", "have", "has", "help", "know", "tell", "about",
+    "what", "how", "when", "where", "why", "who", "which", "there", "any",
+    "much", "long", "many", "if", "with", "work", "job",
+}
+GENERIC_WEIGHT = 0.3
+
+# Words that point back into the conversation: such a question has no
+# answer that holds for every user, so it is never cached
+DEICTIC = {"it", "that", "this", "they", "them", "those", "these", "he", "she", "one"}
+
+def _stem(word: str) -> str:
+    if len(word) > 5 and word.endswith("ing"):
+        return word[:-3]
+    if len(word) > 4 and word.endswith("ed"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def terms(text: str) -> list:
+    """Normalised matching terms: synonyms folded, stopwords dropped, stemmed."""
+    words = [SYNONYMS.get(w, w) for w in _WORD.findall(text.lower())]
+    return [_stem(w) for w in words if w not in STOPWORDS]
+
+def is_cacheable(text: str) -> bool:
+    """A self-contained question: some topic word, nothing referring back."""
+    words = set(_WORD.findall(text.lower()))
+    return not (words & DEICTIC) and any(t not in GENERIC for t in terms(text))
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """
+    Weighted bag of normalised terms plus character trigrams of topic
+    words (for typos), L2-normalised. Generic words count for little, so
+    "is a DBS check required?" and "do I need a DBS?" land together while
+    "do I need a passport?" does not. Stable across processes (crc32, not
+    hash()) and needs no model or network.
+    """
+    vec = np.zeros(dim, dtype=np.float32)
+    for t in terms(text):
+        if t in GENERIC:
+            vec[zlib.crc32(t.encode()) % dim] += GENERIC_WEIGHT
+            continue
+        vec[zlib.crc32(t.encode()) % dim] += 1.0
+        padded = f" {t} "
+        for i in range(len(padded) - 2):
+            vec[zlib.crc32(padded[i:i+3].encode()) % dim] += 0.25
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+class _Scope:
+    def __init__(self, dim: int, size: int):
+        self.vectors = np.zeros((size, dim), dtype=np.float32)
+        self.answers = [None] * size
+        self.count   = 0            # total stores; row = count % size
+
+class SemanticCache:
+    """
+    Similarity cache for free-form questions. Each scope (one per call
+    site) keeps a fixed-size matrix of question vectors; a lookup is one
+    matrix-vector product. Oldest rows are overwritten once full.
+
+    The cache is shared by every session, so callers must only store
+    context-free answers: ones generated from the question and the bot's
+    static prompt prefix alone, for questions that pass is_cacheable().
+    """
+
+    def __init__(self, threshold: float = 0.85, size: int = 2000, dim: int = 4096):
+        self.threshold = threshold
+        self.size      = size
+        self.dim       = dim
+        self.hits      = 0
+        self.misses    = 0
+        self._scopes   = {}
+        self._lock     = threading.Lock()
+
+    def lookup(self, scope: str, question: str):
+        vec = embed(question, self.dim)
+        with self._lock:
+            s = self._scopes.get(scope)
+            filled = min(s.count, self.size) if s else 0
+            if filled and vec.any():
+                scores = s.vectors[:filled] @ vec
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    CACHE_LOOKUPS.labels(cache="semantic", result="hit").inc()
+                    return s.answers[best]
+            self.misses += 1
+            CACHE_LOOKUPS.labels(cache="semantic", result="miss").inc()
+            return None
+
+    def store(self, scope: str, question: str, answer: str):
+        vec = embed(question, self.dim)
+        if not vec.any() or not answer:
+            return
+        with self._lock:
+            s = self._scopes.get(scope)
+            if s is None:
+                s = self._scopes[scope] = _Scope(self.dim, self.size)
+            row = s.count % self.size
+            s.vectors[row] = vec
+            s.answers[row] = answer
+            s.count += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries":  {k: min(s.count, self.size) for k, s in self._scopes.items()},
+        }
+
+faq_cache = SemanticCache(SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_SIZE) if SEMANTIC_CACHE_ENABLED else None
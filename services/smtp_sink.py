@@ -0,0 +1,110 @@
+# services/smtp_sink.py
+#
+# Minimal SMTP server that accepts and counts every message, for testing
+# EMAIL_BACKEND=smtp without a real mail server:
+#   python -m services.smtp_sink --port 8025 [--maildir sink/]
+
+import argparse
+import os
+import socketserver
+import threading
+import time
+
+class SinkStats:
+    def __init__(self):
+        self.messages    = 0
+        self.connections = 0
+        self._lock       = threading.Lock()
+
+    def add(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Speaks just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+    stats   = None
+    maildir = None
+    fail_rcpt = ()                          # recipients to reject with 550, for tests
+
+    def reply(self, line: str):
+        self.wfile.write(line.encode("ascii") + b"\r\n")
+
+    def handle(self):
+        self.stats.add("connections")
+        self.reply("220 smtp-sink ready")
+        rcpts = []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            verb = line.decode("utf-8", "replace").strip().split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self.reply("250-smtp-sink")
+                self.reply("250-8BITMIME")
+                self.reply("250 SMTPUTF8")
+            elif verb == "HELO":
+                self.reply("250 smtp-sink")
+            elif verb == "MAIL":
+                rcpts = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                addr = line.decode("utf-8", "replace").split(":", 1)[-1].strip(" <>\r\n")
+                if addr in self.fail_rcpt:
+                    self.reply("550 mailbox unavailable")
+                else:
+                    rcpts.append(addr)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 end with <CRLF>.<CRLF>")
+                body = []
+                for data in iter(self.rfile.readline, b""):
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    body.append(data)
+                self.stats.add("messages")
+                if self.maildir:
+                    name = f"{time.time_ns()}-{threading.get_ident()}.eml"
+                    with open(os.path.join(self.maildir, name), "wb") as f:
+                        f.writelines(body)
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 bye")
+                return
+            else:
+                self.reply("502 command not implemented")
+
+class _SinkServer(socketserver.ThreadingTCPServer):
+    daemon_threads      = True
+    allow_reuse_address = True
+    request_queue_size  = 256
+
+def serve(host: str = "127.0.0.1", port: int = 8025, maildir: str = None, fail_rcpt=()):
+    """Builds the server; call serve_forever() on it (or run it in a thread)."""
+    if maildir:
+        os.makedirs(maildir, exist_ok=True)
+    handler = type("ConfiguredSinkHandler", (SMTPSinkHandler,), {
+        "stats": SinkStats(), "maildir": maildir, "fail_rcpt": tuple(fail_rcpt),
+    })
+    server = _SinkServer((host, port), handler)
+    server.stats = handler.stats
+    return server
+
+def main():
+    p = argparse.ArgumentParser(description="Local SMTP sink for testing email delivery")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8025)
+    p.add_argument("--maildir", help="also save each message as an .eml file here")
+    args = p.parse_args()
+
+    server = serve(args.host, args.port, args.maildir)
+    print(f"SMTP sink on {args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"{server.stats.messages} messages over {server.stats.connections} connections")
+
+if __name__ == "__main__":
+    main()
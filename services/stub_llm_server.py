@@ -0,0 +1,226 @@
+# services/stub_llm_server.py
+#
+# Offline stand-in for the chat-completions API, for benchmarks and load
+# tests. Replies and timings are deterministic per request (seeded from
+# the request body), so repeated runs are comparable.
+#
+#   python -m services.stub_llm_server --port 8765 --ttft-ms 400 --tokens-per-sec 40
+#   LLM_BACKEND=stub streamlit run app.py
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = (
+    "Thanks for your question. Smile Education will guide you through each step, "
+    "from uploading your documents to arranging the DBS check and matching you "
+    "with schools that suit your experience and availability."
+).split()
+
+class StubSettings:
+    def __init__(self, ttft_ms=400.0, ttft_sigma=0.5, tokens_per_sec=40.0,
+                 reply_tokens=60, reply_sigma=0.4, seed=0, error_rate=0.0,
+                 cache_min_tokens=1024, error_statuses=(429, 500, 503)):
+        self.ttft_ms        = ttft_ms         # median time to first token
+        self.ttft_sigma     = ttft_sigma      # log-normal spread of TTFT
+        self.tokens_per_sec = tokens_per_sec  # streaming rate after the first token
+        self.reply_tokens   = reply_tokens    # median reply length
+        self.reply_sigma    = reply_sigma     # log-normal spread of reply length
+        self.seed           = seed
+        self.error_rate     = error_rate      # share of requests answered 429/500
+        self.cache_min_tokens = cache_min_tokens  # shortest prefix the emulated cache serves
+        self.error_statuses = tuple(error_statuses)  # picked from at random for injected failures
+
+def _count_tokens(text: str) -> int:
+    # Rough OpenAI-style estimate: ~4 characters per token
+    return max(1, math.ceil(len(text) / 4))
+
+def plan_reply(body: dict, settings: StubSettings):
+    """Deterministic (reply tokens, time to first token in seconds) for a request."""
+    digest = hashlib.sha256(
+        json.dumps([settings.seed, body.get("messages")], sort_keys=True).encode()
+    ).digest()
+    rng = random.Random(digest)
+
+    last = str((body.get("messages") or [{}])[-1].get("content", ""))
+    if "'Yes' or 'No'" in last:
+        tokens = [rng.choice(["Yes", "No"])]
+    else:
+        n = max(1, int(rng.lognormvariate(math.log(settings.reply_tokens), settings.reply_sigma)))
+        if body.get("max_tokens"):
+            n = min(n, int(body["max_tokens"]))
+        tokens = [FILLER[i % len(FILLER)] for i in range(n)]
+        tokens = [tokens[0]] + [" " + t for t in tokens[1:]]
+
+    ttft = rng.lognormvariate(math.log(settings.ttft_ms / 1000.0), settings.ttft_sigma)
+    return tokens, ttft
+
+class PrefixCache:
+    """
+    Emulates provider-side prompt caching: a request's leading messages
+    count as cached if an earlier request started with exactly the same
+    messages. Like OpenAI, hits are rounded down to 128-token steps and
+    only prefixes of at least `min_tokens` count.
+    """
+
+    def __init__(self, min_tokens: int = 1024, capacity: int = 50_000):
+        self.min_tokens = min_tokens
+        self.capacity   = capacity
+        self._seen      = OrderedDict()     # prefix digest -> None, LRU order
+        self._lock      = threading.Lock()
+
+    def lookup_and_store(self, messages: list) -> int:
+        digest, tokens, cached, prefixes = hashlib.sha256(), 0, 0, []
+        for m in messages:
+            digest.update(json.dumps([m.get("role"), m.get("content")]).encode())
+            tokens += _count_tokens(str(m.get("content", "")))
+            prefixes.append((digest.hexdigest(), tokens))
+        with self._lock:
+            for key, n in prefixes:
+                if key in self._seen:
+                    self._seen.move_to_end(key)
+                    cached = n
+                else:
+                    self._seen[key] = None
+            while len(self._seen) > self.capacity:
+                self._seen.popitem(last=False)
+        cached -= cached % 128
+        return cached if cached >= self.min_tokens else 0
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    settings = StubSettings()
+    prefix_cache = PrefixCache()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def handle_one_request(self):
+        try:
+            super().handle_one_request()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (timeout, hedge loser); nothing to answer
+            self.close_connection = True
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body   = json.loads(self.rfile.read(length) or b"{}")
+        tokens, ttft = plan_reply(body, self.settings)
+
+        # Injected failures are random, not seeded, so a retry can succeed
+        if self.settings.error_rate and random.random() < self.settings.error_rate:
+            status = random.choice(self.settings.error_statuses)
+            self._send_json(status, {"error": {"message": f"stub injected {status}", "type": "stub_error"}})
+            return
+
+        prompt_tokens = sum(_count_tokens(str(m.get("content", ""))) for m in body.get("messages", []))
+        usage = {
+            "prompt_tokens":     prompt_tokens,
+            "completion_tokens": len(tokens),
+            "total_tokens":      prompt_tokens + len(tokens),
+            "prompt_tokens_details": {
+                "cached_tokens": self.prefix_cache.lookup_and_store(body.get("messages", [])),
+            },
+        }
+        base = {
+            "id":      "chatcmpl-stub-" + hashlib.md5(repr(body).encode()).hexdigest()[:12],
+            "created": int(time.time()),
+            "model":   body.get("model", "stub"),
+        }
+        per_token = 1.0 / self.settings.tokens_per_sec
+
+        time.sleep(ttft)
+        if not body.get("stream"):
+            time.sleep(per_token * (len(tokens) - 1))
+            self._send_json(200, dict(base, object="chat.completion", usage=usage, choices=[{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop",
+            }]))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, tok in enumerate(tokens):
+            if i:
+                time.sleep(per_token)
+            self._send_event(dict(base, object="chat.completion.chunk", choices=[{
+                "index": 0,
+                "delta": {"role": "assistant", "content": tok} if i == 0 else {"content": tok},
+                "finish_reason": None,
+            }]))
+        self._send_event(dict(base, object="chat.completion.chunk", choices=[{
+            "index": 0, "delta": {}, "finish_reason": "stop",
+        }]))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._send_event(dict(base, object="chat.completion.chunk", choices=[], usage=usage))
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_json(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_event(self, payload: dict):
+        self._send_chunk(b"data: " + json.dumps(payload).encode() + b"\n\n")
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads     = True
+    request_queue_size = 256        # load tests open many connections at once
+
+def serve(host: str = "127.0.0.1", port: int = 8765, settings: StubSettings = None) -> ThreadingHTTPServer:
+    """Builds the server; call serve_forever() on it (or run it in a thread)."""
+    settings = settings or StubSettings()
+    handler  = type("ConfiguredStubHandler", (StubHandler,), {
+        "settings": settings, "prefix_cache": PrefixCache(settings.cache_min_tokens),
+    })
+    return _StubServer((host, port), handler)
+
+def main():
+    p = argparse.ArgumentParser(description="Offline chat-completions stub server")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--ttft-ms", type=float, default=400.0, help="median time to first token")
+    p.add_argument("--ttft-sigma", type=float, default=0.5, help="log-normal spread of TTFT")
+    p.add_argument("--tokens-per-sec", type=float, default=40.0)
+    p.add_argument("--reply-tokens", type=int, default=60, help="median reply length in tokens")
+    p.add_argument("--reply-sigma", type=float, default=0.4)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--error-rate", type=float, default=0.0, help="share of requests failed with 429/5xx")
+    p.add_argument("--error-status", type=int, action="append",
+                   help="status for injected failures (repeatable; default 429, 500, 503)")
+    p.add_argument("--cache-min-tokens", type=int, default=1024,
+                   help="shortest prompt prefix the emulated prompt cache reports as cached")
+    args = p.parse_args()
+
+    settings = StubSettings(args.ttft_ms, args.ttft_sigma, args.tokens_per_sec,
+                            args.reply_tokens, args.reply_sigma, args.seed, args.error_rate,
+                            args.cache_min_tokens, args.error_status or (429, 500, 503))
+    server = serve(args.host, args.port, settings)
+    print(f"Stub LLM server on http://{args.host}:{args.port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+# services/summariser.py
+
+from services.llm_service import acall_llm
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain the running memory of a Smile Education recruitment chat. "
+    "Keep names, contact details, requirements, documents discussed and "
+    "decisions made. Drop greetings and small talk. Plain text, at most 150 words."
+)
+
+async def fold_into_summary(summary: str, messages: list, session_id: str = None) -> str:
+    """Returns `summary` updated with `messages` (oldest first)."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = (
+        f"Current summary:\n{summary or '(none yet)'}\n\n"
+        f"Newer messages:\n{transcript}\n\n"
+        "Rewrite the summary so it also covers the newer messages."
+    )
+    return await acall_llm(
+        SUMMARY_SYSTEM_PROMPT, [], prompt,
+        purpose="summary", use_cache=False, agent="Memory", session_id=session_id
+    )
@@ -0,0 +1,87 @@
+# services/tokens.py
+
+import threading
+from collections import defaultdict
+
+# Chat format overhead per message / per reply (OpenAI cookbook figures)
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY   = 3
+
+_encoding = None
+_encoding_loaded = False
+
+def _get_encoding():
+    """tiktoken's GPT-4 encoding if installed (optional), else None."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model("gpt-4")
+        except Exception:
+            _encoding = None
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    enc = _get_encoding()
+    if enc is not None:
+        return len(enc.encode(text))
+    # ~4 characters per token for English text
+    return (len(text) + 3) // 4
+
+def count_message_tokens(messages: list) -> int:
+    return TOKENS_PER_REPLY + sum(
+        TOKENS_PER_MESSAGE + count_tokens(m["content"]) for m in messages
+    )
+
+def fit_to_budget(messages: list, budget: int):
+    """
+    Drops the oldest raw turns until the prompt fits `budget`. The leading
+    system messages (the system prompt and the rolling summary that
+    ConversationManager puts after it) and the final user message are
+    always kept. Returns (messages, prompt_tokens, dropped_count).
+    """
+    sizes = [TOKENS_PER_MESSAGE + count_tokens(m["content"]) for m in messages]
+    total = TOKENS_PER_REPLY + sum(sizes)
+    keep  = 1
+    while keep < len(messages) - 1 and messages[keep]["role"] == "system":
+        keep += 1
+    start = keep
+    while total > budget and start < len(messages) - 1:
+        total -= sizes[start]
+        start += 1
+    dropped = start - keep
+    return messages[:keep] + messages[start:], total, dropped
+
+class UsageTotals:
+    """Running token usage for one scope (process, agent or session)."""
+
+    def __init__(self):
+        self.calls             = 0
+        self.prompt_tokens     = 0
+        self.completion_tokens = 0
+        self.trimmed_messages  = 0
+        self.cached_tokens     = 0          # prompt tokens served from the provider's prefix cache
+        self._lock             = threading.Lock()
+
+    def add(self, prompt_tokens: int, completion_tokens: int, trimmed: int = 0,
+            cached_tokens: int = 0):
+        with self._lock:
+            self.calls             += 1
+            self.prompt_tokens     += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.trimmed_messages  += trimmed
+            self.cached_tokens     += cached_tokens
+
+    def as_dict(self) -> dict:
+        return {
+            "calls":             self.calls,
+            "prompt_tokens":     self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens":      self.prompt_tokens + self.completion_tokens,
+            "trimmed_messages":  self.trimmed_messages,
+            "cached_tokens":     self.cached_tokens,
+        }
+
+total_usage    = UsageTotals()
+usage_by_agent = defaultdict(UsageTotals)
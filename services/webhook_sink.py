@@ -0,0 +1,104 @@
+# services/webhook_sink.py
+#
+# Local stand-in for the applicant-tracking system's bulk webhook, for
+# testing services/webhooks.py without the real ATS:
+#   python -m services.webhook_sink --port 8090 [--error-rate 0.2] [--reject-id ID] [--out events.jsonl]
+#   WEBHOOK_URL=http://127.0.0.1:8090/events streamlit run app.py
+
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class SinkStats:
+    def __init__(self):
+        self.posts     = 0
+        self.events    = 0
+        self.failed    = 0
+        self.event_ids = set()              # distinct ids, to spot duplicate deliveries
+        self._lock     = threading.Lock()
+
+    def add(self, events: list):
+        with self._lock:
+            self.posts  += 1
+            self.events += len(events)
+            self.event_ids.update(e.get("event_id") for e in events)
+
+class WebhookSinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"           # keep-alive, like a real ATS endpoint
+    stats      = None
+    error_rate = 0.0                        # share of POSTs answered with 503
+    reject     = False                      # answer every POST with 422
+    reject_ids = frozenset()                # 422 for any POST carrying one of these event ids
+    out        = None                       # optional open file for received events
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.reject:
+            return self._reply(422, b'{"error": "rejected"}')
+        if random.random() < self.error_rate:
+            with self.stats._lock:
+                self.stats.failed += 1
+            return self._reply(503, b'{"error": "try again"}')
+        try:
+            events = json.loads(body)["events"]
+        except (ValueError, KeyError, TypeError):
+            return self._reply(400, b'{"error": "expected {\\"events\\": [...]}"}')
+        if any(e.get("event_id") in self.reject_ids for e in events):
+            return self._reply(422, b'{"error": "invalid event"}')
+        self.stats.add(events)
+        if self.out:
+            with self.stats._lock:
+                self.out.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+                self.out.flush()
+        self._reply(200, json.dumps({"accepted": len(events)}).encode("utf-8"))
+
+    def _reply(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class _SinkServer(ThreadingHTTPServer):
+    daemon_threads     = True
+    request_queue_size = 256
+
+def serve(host: str = "127.0.0.1", port: int = 8090, error_rate: float = 0.0,
+          reject: bool = False, out: str = None, reject_ids=()) -> ThreadingHTTPServer:
+    """Builds the server; call serve_forever() on it (or run it in a thread)."""
+    handler = type("ConfiguredWebhookSinkHandler", (WebhookSinkHandler,), {
+        "stats": SinkStats(), "error_rate": error_rate, "reject": reject,
+        "reject_ids": frozenset(reject_ids),
+        "out": open(out, "a", encoding="utf-8") if out else None,
+    })
+    server = _SinkServer((host, port), handler)
+    server.stats = handler.stats
+    return server
+
+def main():
+    p = argparse.ArgumentParser(description="Local stand-in for the ATS bulk webhook")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8090)
+    p.add_argument("--error-rate", type=float, default=0.0, help="share of POSTs failed with 503")
+    p.add_argument("--reject", action="store_true", help="answer every POST with 422")
+    p.add_argument("--reject-id", action="append", default=[],
+                   help="answer any POST containing this event id with 422 (repeatable)")
+    p.add_argument("--out", help="append received events to this JSON-lines file")
+    args = p.parse_args()
+
+    server = serve(args.host, args.port, args.error_rate, args.reject, args.out, args.reject_id)
+    print(f"Webhook sink on http://{args.host}:{args.port}/events")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    s = server.stats
+    print(f"{s.events} events ({len(s.event_ids)} distinct) in {s.posts} POSTs; {s.failed} failed")
+
+if __name__ == "__main__":
+    main()
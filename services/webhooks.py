@@ -0,0 +1,179 @@
+# services/webhooks.py
+#
+# Pushes registration and shortlist records to the applicant-tracking
+# system. Events are queued in a durable outbox (so a chat turn only pays
+# for one SQLite insert) and POSTed in bulk:
+#   POST WEBHOOK_URL  {"events": [{"event_id", "event", "session_id", ...}, ...]}
+# A rejected batch is split and re-sent until the refused events are
+# isolated. Those, and rows that run out of attempts, stay in the outbox
+# as dead letters:
+#   python -m services.webhooks dead            # list them
+#   python -m services.webhooks retry           # queue them again
+# A local stand-in for the ATS: python -m services.webhook_sink
+
+import argparse
+import atexit
+import http.client
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from config import (
+    WEBHOOK_URL, WEBHOOK_TOKEN, WEBHOOK_OUTBOX_PATH, WEBHOOK_BATCH_SIZE,
+    WEBHOOK_CONCURRENCY, WEBHOOK_TIMEOUT, WEBHOOK_MAX_ATTEMPTS,
+)
+from core import metrics
+from core.logger import log_event
+from services.outbox import Outbox, PermanentDeliveryError
+
+WEBHOOK_POSTS = metrics.counter(
+    "smilebot_webhook_posts_total", "Bulk webhook POSTs by result (ok, retry, rejected)", ["result"]
+)
+WEBHOOK_SECONDS = metrics.histogram("smilebot_webhook_post_seconds", "Bulk webhook POST latency")
+
+# Statuses worth retrying; any other 4xx means the ATS will never accept it
+RETRY_STATUSES = {408, 425, 429}
+
+class WebhookError(Exception):
+    pass
+
+class WebhookDispatcher:
+    """
+    Delivers queued events in bulk POSTs of up to `batch_size` events,
+    with at most `concurrency` requests in flight. Each worker thread keeps
+    its own keep-alive connection. 5xx replies, 408/429 and network errors
+    are retried with the outbox's backoff. Other 4xx replies are final: the
+    batch is bisected and re-sent until only the events the ATS refuses on
+    their own are dead-lettered.
+    """
+
+    def __init__(self, url: str, path: str, token: str = None, batch_size: int = 100,
+                 concurrency: int = 4, timeout: float = 10.0, max_attempts: int = 8):
+        parts = urlsplit(url)
+        self.url        = url
+        self.secure     = parts.scheme == "https"
+        self.host       = parts.hostname
+        self.port       = parts.port
+        self.target     = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        self.token      = token
+        self.batch_size = batch_size
+        self.timeout    = timeout
+        self._local     = threading.local()
+        self._workers   = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="webhook")
+        # One outbox batch fills every worker
+        self.outbox = Outbox("webhook", path, self._deliver, batch_size * concurrency,
+                             max_attempts=max_attempts)
+
+    def publish(self, event: str, session_id: str, record: dict, turn_id: str = None) -> bool:
+        """Queues one event; False if this session already published it."""
+        return self.outbox.put(session_id, event, {
+            "event_id": f"{session_id or uuid.uuid4().hex}:{event}",
+            "event": event, "session_id": session_id, "turn_id": turn_id,
+            "occurred_at": time.time(), "record": record,
+        })
+
+    def _deliver(self, items: list) -> list:
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        results = []
+        for chunk_results in self._workers.map(self._post_chunk, chunks):
+            results.extend(chunk_results)
+        return results
+
+    def _post_chunk(self, chunk: list) -> list:
+        """One result per event in `chunk`."""
+        error = self._post_events([payload for _, payload in chunk])
+        if isinstance(error, PermanentDeliveryError) and len(chunk) > 1:
+            # Don't let one bad event sink the valid ones batched with it
+            mid = len(chunk) // 2
+            return self._post_chunk(chunk[:mid]) + self._post_chunk(chunk[mid:])
+        return [error] * len(chunk)
+
+    def _post_events(self, events: list):
+        body   = json.dumps({"events": events}, ensure_ascii=False).encode("utf-8")
+        started = time.perf_counter()
+        try:
+            status = self._post(body)
+        except (OSError, http.client.HTTPException) as e:
+            self._drop_connection()
+            WEBHOOK_POSTS.labels(result="retry").inc()
+            return e
+        elapsed = time.perf_counter() - started
+        WEBHOOK_SECONDS.observe(elapsed)
+        log_event("webhook_post", events=len(events), status=status, secs=round(elapsed, 4))
+
+        if 200 <= status < 300:
+            WEBHOOK_POSTS.labels(result="ok").inc()
+            return None
+        if status < 500 and status not in RETRY_STATUSES:
+            WEBHOOK_POSTS.labels(result="rejected").inc()
+            return PermanentDeliveryError(f"webhook rejected event: HTTP {status}")
+        WEBHOOK_POSTS.labels(result="retry").inc()
+        return WebhookError(f"webhook unavailable: HTTP {status}")
+
+    def _post(self, body: bytes) -> int:
+        headers = {"Content-Type": "application/json"}
+        if self.token:
+            headers["Authorization"] = f"Bearer {self.token}"
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request("POST", self.target, body, headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.will_close:
+                    self._drop_connection()
+                return resp.status
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self._drop_connection()
+                if attempt:
+                    raise
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls  = http.client.HTTPSConnection if self.secure else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+ats_webhook = (
+    WebhookDispatcher(WEBHOOK_URL, WEBHOOK_OUTBOX_PATH, WEBHOOK_TOKEN, WEBHOOK_BATCH_SIZE,
+                      WEBHOOK_CONCURRENCY, WEBHOOK_TIMEOUT, WEBHOOK_MAX_ATTEMPTS)
+    if WEBHOOK_URL else None
+)
+if ats_webhook is not None:
+    atexit.register(ats_webhook.outbox.flush, 2.0)
+
+def publish(event: str, session_id: str, record: dict, turn_id: str = None) -> bool:
+    """Queues an event for the ATS; a no-op when WEBHOOK_URL is unset."""
+    if ats_webhook is None:
+        return False
+    return ats_webhook.publish(event, session_id, record, turn_id)
+
+def main():
+    p = argparse.ArgumentParser(description="Inspect or replay webhook dead letters")
+    p.add_argument("command", choices=["dead", "retry"])
+    p.add_argument("--limit", type=int, default=50)
+    args = p.parse_args()
+
+    if ats_webhook is None:
+        raise SystemExit("WEBHOOK_URL is not set")
+    if args.command == "dead":
+        for row in ats_webhook.outbox.dead_letters(args.limit):
+            print(f"{row['msg_key']}  attempts={row['attempts']}  {row['error']}")
+    else:
+        n = ats_webhook.outbox.requeue_failed()
+        print(f"requeued {n} dead letters")
+        ats_webhook.outbox.flush(60.0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import os
+import shutil
+import sys
+import tempfile
+
+# Point every file the app writes at a scratch directory before any app
+# module (config.py reads these at import) is loaded
+_scratch = tempfile.mkdtemp(prefix="smilebot-tests-")
+for _name, _rel in {
+    "LOG_PATH":            "logs/conversation.jsonl",
+    "LOG_INDEX_PATH":      "logs/index.sqlite3",
+    "EMAIL_STORE_ROOT":    "emails",
+    "SUMMARY_STORE_ROOT":  "summaries",
+    "EMAIL_OUTBOX_PATH":   "outbox/email.sqlite3",
+    "WEBHOOK_OUTBOX_PATH": "outbox/webhooks.sqlite3",
+    "SESSION_STORE_PATH":  "sessions/sessions.sqlite3",
+    "LLM_CACHE_PATH":      "cache/llm_responses.sqlite3",
+    "LLM_RECORDING_PATH":  "recordings/llm_calls.jsonl",
+}.items():
+    os.environ[_name] = os.path.join(_scratch, _rel)
+os.environ["METRICS_ENABLED"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def pytest_unconfigure(config):
+    logger = sys.modules.get("core.logger")
+    if logger is not None:
+        logger.writer.flush()
+    shutil.rmtree(_scratch, ignore_errors=True)
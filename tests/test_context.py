@@ -0,0 +1,42 @@
+import pytest
+
+from core.context import FIELDS, ConversationContext
+
+def filled():
+    context = ConversationContext()
+    context.update("user_type", "school")
+    context.update("school_name", "Hill Primary — Année")   # non-ASCII survives
+    context.update("contract_length", 6)
+    context.update("special_requirements", ["SEN", "first aid"])
+    context.update("requirements_captured", True)
+    return context
+
+def test_full_snapshot_round_trip():
+    context = filled()
+    restored = ConversationContext.from_bytes(context.to_bytes())
+    assert dict(restored.data) == dict(context.data)
+
+def test_partial_dirty_mask_carries_only_changed_fields():
+    journal = []
+    context = ConversationContext(lambda kind, blob: journal.append((kind, blob)))
+    context.load_bytes(filled().to_bytes())             # a restore journals nothing
+    assert journal == []
+
+    with context.deferred():
+        context.update("start_date", "next Monday")
+        context.update("school_name", None)
+        assert journal == []                            # held until the block ends
+    assert len(journal) == 1 and journal[0][0] == "context"
+
+    # Applied to an older copy, the delta sets those two fields and nothing else
+    older = filled()
+    mask = older.load_bytes(journal[0][1])
+    assert mask == (1 << FIELDS.index("start_date")) | (1 << FIELDS.index("school_name"))
+    assert dict(older.data) == dict(context.data)
+    assert older.contract_length == 6 and older.special_requirements == ["SEN", "first aid"]
+
+def test_unknown_format_is_rejected():
+    blob = bytearray(filled().to_bytes())
+    blob[0] = 99
+    with pytest.raises(ValueError):
+        ConversationContext.from_bytes(bytes(blob))
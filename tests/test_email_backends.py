@@ -0,0 +1,45 @@
+import threading
+
+import pytest
+
+from services.email_backends import SMTPPool, build_message
+from services.outbox import PermanentDeliveryError
+from services.smtp_sink import serve
+
+@pytest.fixture
+def sink():
+    server = serve(port=0, fail_rcpt=["bounce@example.com"])
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def pool(sink):
+    pool = SMTPPool("127.0.0.1", sink.server_address[1], size=1, timeout=5.0)
+    yield pool
+    pool.close()
+
+def test_unexpected_error_closes_the_connection(pool):
+    with pytest.raises(UnicodeEncodeError):
+        with pool.connection() as conn:
+            raise UnicodeEncodeError("ascii", "é", 0, 1, "bad header")
+    assert conn.sock is None                # closed, not leaked
+    assert pool._idle.empty()
+
+def message(to):
+    return build_message("candidate_list", {"to": to, "candidates": "Candidate A\nCandidate B"})
+
+def test_messages_delivered_over_one_pooled_connection(pool, sink):
+    results = pool.send_many([message(f"school{i}@example.com") for i in range(5)])
+    assert results == [None] * 5
+    assert sink.stats.messages == 5
+    assert sink.stats.connections == 1
+
+def test_550_is_a_permanent_failure(pool, sink):
+    with pytest.raises(PermanentDeliveryError):
+        pool.send(message("bounce@example.com"))
+    # The refusal doesn't cost the connection
+    pool.send(message("school@example.com"))
+    assert sink.stats.messages == 1
+    assert sink.stats.connections == 1
@@ -0,0 +1,43 @@
+import json
+import sqlite3
+
+from core.session_store import SessionStore
+from services.log_index import LogIndex
+
+def test_transcripts_indexed_incrementally_by_event_id(tmp_path):
+    store_path = str(tmp_path / "sessions.sqlite3")
+    store = SessionStore(store_path)
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+
+    store.append("s1", "user", {"text": "do I need a DBS check?"})
+    store.append("s1", "assistant", {"text": "Yes, an enhanced DBS."})
+    assert index._index_transcripts(store_path) == 2
+    assert index._index_transcripts(store_path) == 0
+
+    store.append("s2", "user", {"text": "what about references?"})
+    assert index._index_transcripts(store_path) == 1
+    assert {d["session_id"] for d in index.search("dbs")} == {"s1"}
+
+def test_refresh_uses_the_id_index(tmp_path):
+    store_path = str(tmp_path / "sessions.sqlite3")
+    SessionStore(store_path)
+    plan = sqlite3.connect(store_path).execute(
+        "EXPLAIN QUERY PLAN SELECT id, session_id, at, kind, payload FROM events"
+        " WHERE id > 0 AND kind IN ('user', 'assistant') ORDER BY id"
+    ).fetchall()
+    assert "USING INDEX events_id" in " ".join(row[-1] for row in plan)
+
+def test_log_truncated_in_place_is_reindexed_from_the_start(tmp_path):
+    log_path = tmp_path / "conversation.jsonl"
+    index = LogIndex(str(tmp_path / "index.sqlite3"))
+
+    log_path.write_text("".join(
+        json.dumps({"kind": "turn", "response": f"first batch line {i}"}) + "\n" for i in range(20)
+    ))
+    assert index._index_log_file(str(log_path)) == 20
+
+    # Same inode, shorter content: the saved offset is past the end
+    with open(log_path, "w") as f:
+        f.write(json.dumps({"kind": "turn", "response": "after truncate"}) + "\n")
+    assert index._index_log_file(str(log_path)) == 1
+    assert [d["snippet"] for d in index.search("truncate")] == ["after truncate"]
@@ -0,0 +1,16 @@
+import json
+
+from core.logger import JsonLineWriter
+
+def read_kinds(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["kind"] for line in f]
+
+def test_truncate_goes_through_the_writer(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    writer = JsonLineWriter(path, max_bytes=1 << 20, rotate_secs=3600, backups=2)
+    writer.write({"kind": "before"})
+    writer.truncate()
+    writer.write({"kind": "after"})
+    writer.close()
+    assert read_kinds(path) == ["after"]
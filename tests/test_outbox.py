@@ -0,0 +1,44 @@
+import sqlite3
+
+from services.outbox import Outbox
+
+class Recorder:
+    def __init__(self):
+        self.delivered = []
+
+    def __call__(self, items):
+        self.delivered.extend(payload["n"] for _, payload in items)
+        return [None] * len(items)
+
+def test_duplicate_put_is_a_no_op(tmp_path):
+    deliver = Recorder()
+    outbox = Outbox("test", str(tmp_path / "outbox.sqlite3"), deliver)
+    assert outbox.put("s1", "upload_form", {"n": 1}) is True
+    assert outbox.put("s1", "upload_form", {"n": 2}) is False
+    assert outbox.put("s2", "upload_form", {"n": 3}) is True
+    assert outbox.flush(5.0)
+    assert sorted(deliver.delivered) == [1, 3]
+
+    # Still a duplicate once sent, and after a restart
+    assert outbox.put("s1", "upload_form", {"n": 4}) is False
+    reopened = Outbox("test", str(tmp_path / "outbox.sqlite3"), deliver)
+    assert reopened.put("s2", "upload_form", {"n": 5}) is False
+    assert reopened.flush(5.0)
+    assert sorted(deliver.delivered) == [1, 3]
+
+def test_worker_survives_a_failed_batch(tmp_path):
+    deliver = Recorder()
+    outbox = Outbox("test", str(tmp_path / "outbox.sqlite3"), deliver)
+    real, calls = outbox._deliver_batch, []
+
+    def locked_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return real()
+
+    outbox._deliver_batch = locked_once
+    outbox.put("s1", "upload_form", {"n": 1})
+    assert outbox.flush(5.0)
+    assert deliver.delivered == [1]
+    assert outbox._thread.is_alive()
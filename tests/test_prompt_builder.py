@@ -0,0 +1,44 @@
+from core.context import ConversationContext
+from core.conversation_manager import ConversationManager
+from services import prompt_builder
+from services.llm_service import _build_messages
+from services.prompt_builder import build_prompt, prompt_prefix
+
+def system_message(user_type, context, manager, text="hello"):
+    return _build_messages(build_prompt(user_type, context), manager.get_last_messages(), text)[0]
+
+def test_prefix_stable_across_context_updates_and_turns():
+    for user_type, field, value in (("candidate", "name", "Ada Lovelace"),
+                                    ("school", "school_name", "Hill Primary"),
+                                    ("other", "user_type", "other")):
+        context, manager = ConversationContext(), ConversationManager()
+        prefix = prompt_prefix(user_type)
+        before = system_message(user_type, context, manager)
+
+        context.update(field, value)
+        manager.add_user_message("I'd like to register")
+        manager.add_assistant_message("Great, what's your name?")
+        after = system_message(user_type, context, manager, "Ada")
+
+        assert before["content"].startswith(prefix)
+        assert after["content"].startswith(prefix)
+
+def test_context_follows_prefix():
+    context = ConversationContext()
+    context.update("name", "Ada Lovelace")
+    content = build_prompt("candidate", context)["content"]
+    assert content.index("Ada Lovelace") > len(prompt_prefix("candidate"))
+
+def test_build_prompt_reused_until_context_changes():
+    context = ConversationContext()
+    first = build_prompt("candidate", context)
+    assert build_prompt("candidate", context) is first
+    context.update("email", "ada@example.com")
+    assert build_prompt("candidate", context) is not first
+
+def test_version_bump_changes_prefix(monkeypatch):
+    old = {t: prompt_prefix(t) for t in ("candidate", "school", "other")}
+    monkeypatch.setattr(prompt_builder, "PROMPT_VERSION", prompt_builder.PROMPT_VERSION + ".1")
+    for user_type, prefix in old.items():
+        assert prompt_prefix(user_type) != prefix
+        assert build_prompt(user_type, {})["content"].startswith(prompt_prefix(user_type))
@@ -0,0 +1,28 @@
+import pytest
+
+from services.readiness_classifier import classifier, classify_readiness, has_negation
+
+pytestmark = pytest.mark.skipif(classifier is None, reason="readiness model not trained")
+
+@pytest.mark.parametrize("text", [
+    "please don't send it yet",
+    "don't send it",
+    "I'm not ready to send",
+    "not yet",
+    "wait",
+    "hold on",
+    "send it later",
+])
+def test_negated_or_deferred_turns_never_send(text):
+    assert has_negation(text)
+    assert classify_readiness(text) is None         # left to the LLM
+
+@pytest.mark.parametrize("text", ["ok send it", "send it please", "yes please send it"])
+def test_clear_go_ahead_is_decided_locally(text):
+    assert not has_negation(text)
+    assert classify_readiness(text) is True
+
+def test_negated_requests_score_not_done():
+    for text in ("please don't send it yet", "I'm not ready to send", "don't send the email yet"):
+        done, confidence = classifier.predict(text)
+        assert not done and confidence > 0.9
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+import pytest
+
+from services import resilience
+from services.llm_backends import StubBackend
+from services.resilience import LLMUnavailableError, call_with_retries
+from services.stub_llm_server import StubSettings, serve
+
+MESSAGES = [{"role": "user", "content": "do I need a DBS?"}]
+
+@pytest.fixture
+def stub():
+    settings = StubSettings(ttft_ms=1, ttft_sigma=0.0, tokens_per_sec=10_000, reply_tokens=5,
+                            error_rate=1.0, error_statuses=(429,))
+    server = serve(port=0, settings=settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield settings, StubBackend(f"http://127.0.0.1:{server.server_address[1]}/v1")
+    server.shutdown()
+    server.server_close()
+
+def call(backend, make_call, purpose, retries=2):
+    return asyncio.run(call_with_retries(
+        make_call, purpose, timeout=5.0, retries=retries, is_transient=backend.is_transient,
+        backoff_base=0.01, backoff_cap=0.05,
+    ))
+
+def test_429_is_retried(stub):
+    settings, backend = stub
+    attempts = []
+
+    async def make_call():
+        attempts.append(1)
+        if len(attempts) == 2:
+            settings.error_rate = 0.0       # the rate limit has passed
+        return await backend.complete("gpt-4o-mini", MESSAGES)
+
+    assert call(backend, make_call, "test_429")
+    assert len(attempts) == 2
+    assert resilience.stats.counts[("test_429", "retries")] == 1
+
+def test_gives_up_after_the_last_retry(stub):
+    _, backend = stub
+    attempts = []
+
+    async def make_call():
+        attempts.append(1)
+        return await backend.complete("gpt-4o-mini", MESSAGES)
+
+    with pytest.raises(LLMUnavailableError):
+        call(backend, make_call, "test_429_exhausted", retries=2)
+    assert len(attempts) == 3
+    assert resilience.stats.counts[("test_429_exhausted", "failures")] == 1
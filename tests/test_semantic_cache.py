@@ -0,0 +1,24 @@
+from services.semantic_cache import SemanticCache, is_cacheable
+
+DBS_ANSWER = "Yes, every candidate needs an enhanced DBS check."
+
+def make_cache():
+    cache = SemanticCache(threshold=0.85, size=16)
+    cache.store("general", "is a DBS check required?", DBS_ANSWER)
+    return cache
+
+def test_paraphrase_hits():
+    assert make_cache().lookup("general", "do I need a DBS?") == DBS_ANSWER
+
+def test_unrelated_question_misses():
+    cache = make_cache()
+    assert cache.lookup("general", "do I need a passport?") is None
+    assert cache.lookup("general", "how long does a DBS check take?") is None
+
+def test_scopes_are_separate():
+    assert make_cache().lookup("candidate_docs", "do I need a DBS?") is None
+
+def test_context_dependent_questions_are_not_cacheable():
+    assert is_cacheable("do I need a DBS?")
+    assert not is_cacheable("what about that?")
+    assert not is_cacheable("how?")
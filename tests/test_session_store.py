@@ -0,0 +1,47 @@
+import time
+
+from core.context import ConversationContext
+from core.conversation_manager import ConversationManager
+from core.session_store import SessionStore
+
+async def fake_summarise(summary, batch, session_id=None):
+    return f"{summary or ''}[{len(batch)} folded]"
+
+def wait_for_fold(manager, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if manager.summary and not manager._summarising:
+            return
+        time.sleep(0.01)
+    raise AssertionError("rolling summary never folded")
+
+def test_restore_rebuilds_manager_and_context(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.sqlite3"))
+    session_id = store.new_session()
+    journal = store.journal(session_id)
+
+    context = ConversationContext(journal)
+    manager = ConversationManager(summarise=fake_summarise, journal=journal, session_id=session_id)
+    context.update("user_type", "candidate")
+    with context.deferred():
+        context.update("name", "Ada Lovelace")
+        context.update("email", "ada@example.com")
+        context.update("script_complete", True)
+    for i in range(12):                     # well past MEMORY_TOKEN_BUDGET
+        manager.add_user_message(f"question {i} " + "about documents " * 60)
+        manager.add_assistant_message(f"answer {i} " + "details " * 60)
+    wait_for_fold(manager)
+
+    context2, manager2 = ConversationContext(), ConversationManager(summarise=fake_summarise)
+    transcript = store.restore(session_id, manager2, context2)
+
+    assert dict(context2.data) == dict(context.data)
+    assert manager2.summary == manager.summary
+    assert manager2.get_last_messages() == manager.get_last_messages()
+    assert len(transcript) == 24 and transcript[0][0] == "user"
+
+    # The journal stays attached: later updates land in the same session
+    context2.update("phone", "0123")
+    context3 = ConversationContext()
+    store.restore(session_id, ConversationManager(), context3)
+    assert context3.phone == "0123"
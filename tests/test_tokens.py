@@ -0,0 +1,23 @@
+from services.llm_service import _build_messages
+from services.tokens import count_message_tokens, fit_to_budget
+
+SUMMARY = {"role": "system", "content": "Summary of the earlier conversation:\nName Ada, wants a TA role."}
+
+def turns(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 40}
+            for i in range(n)]
+
+def test_summary_kept_under_budget_pressure():
+    messages = _build_messages("You are CandidateBot.", [SUMMARY] + turns(10), "what next?")
+    fitted, tokens, dropped = fit_to_budget(messages, 200)
+
+    assert fitted[0]["content"] == "You are CandidateBot."
+    assert fitted[1] == SUMMARY
+    assert fitted[-1] == {"role": "user", "content": "what next?"}
+    assert dropped > 0
+    assert fitted[2:-1] == messages[2 + dropped:-1]     # oldest raw turns go first
+    assert tokens == count_message_tokens(fitted) <= 200
+
+def test_within_budget_is_unchanged():
+    messages = _build_messages("You are CandidateBot.", [SUMMARY] + turns(2), "hi")
+    assert fit_to_budget(messages, 10_000) == (messages, count_message_tokens(messages), 0)
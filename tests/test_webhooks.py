@@ -0,0 +1,22 @@
+import threading
+
+from services.webhook_sink import serve
+from services.webhooks import WebhookDispatcher
+
+def test_rejected_event_does_not_dead_letter_its_batch(tmp_path):
+    server = serve(port=0, reject_ids={"s3:candidate.registered"})
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/events"
+        dispatcher = WebhookDispatcher(url, str(tmp_path / "webhooks.sqlite3"), batch_size=8,
+                                       concurrency=1, max_attempts=2)
+        for i in range(8):
+            dispatcher.publish("candidate.registered", f"s{i}", {"n": i})
+        assert dispatcher.outbox.flush(10.0)
+
+        dead = dispatcher.outbox.dead_letters()
+        assert [row["payload"]["event_id"] for row in dead] == ["s3:candidate.registered"]
+        assert server.stats.event_ids == {f"s{i}:candidate.registered" for i in range(8) if i != 3}
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,25 +1,39 @@
 # ui/chat_loop.py
 
+from core.timing import format_snapshot
 
 
-def run_chat_loop(agent, context):
+def run_chat_loop(agent, context, transcript=None):
     """
     1) Print banner
-    2) Seed with "start"
-    3) Loop: read → add_user_message → generate_response → add_assistant_message → print
+    2) Seed with "start", or show where a resumed transcript left off
+    3) Loop: read → add_user_message → stream_response (printed as it arrives) → add_assistant_message
     """
-    print("\n💬 You're now chatting with Smile Assistant. Type 'exit' to quit.\n")
+    print("\n💬 You're now chatting with Smile Assistant. Type 'exit' to quit, "
+          "'/timings' for latency stats.\n")
 
-    reply,_,_ = agent.generate_response("start")
-    print(f"🤖 {reply}")
+    if transcript:
+        for role, text in transcript[-2:]:
+            print(f"{'🤖' if role == 'assistant' else 'You:'} {text}")
+    else:
+        reply,_,_ = agent.generate_response("start")
+        print(f"🤖 {reply}")
 
     while True:
         user_in = input("\nYou: ")
         if user_in.lower() in ("exit","quit"):
             print("🤖 Goodbye!")
             return
+        if user_in.strip() == "/timings":
+            print(format_snapshot())
+            continue
 
         agent.memory_manager.add_user_message(user_in)
-        reply,_,_ = agent.generate_response(user_in)
-        agent.memory_manager.add_assistant_message(reply)
-        print(f"🤖 {reply}")
+        # Print tokens as they arrive
+        print("🤖 ", end="", flush=True)
+        parts = []
+        for chunk in agent.stream_response(user_in):
+            parts.append(chunk)
+            print(chunk, end="", flush=True)
+        print()
+        agent.memory_manager.add_assistant_message("".join(parts), agent.reply_priority)